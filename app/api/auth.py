@@ -1,10 +1,11 @@
 from fastapi import HTTPException, Depends, APIRouter
 from app.db.models import UserProfile, RefreshToken
-from app.db.schemas import UserProfileSchema, UserProfileLoginSchema, UserProfileCreateSchema
-from app.db.database import SessionLocal
-from sqlalchemy.orm import Session
+from app.db.schemas import (UserProfileSchema, UserProfileLoginSchema, UserProfileCreateSchema,
+                            CurrentUserSchema)
+from app.db.database import get_db, SessionRoute
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from passlib.context import CryptContext
 from jose import jwt, JWTError
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from app.config import (ALGORITHM, SECRET_KEY,
@@ -12,47 +13,81 @@ from app.config import (ALGORITHM, SECRET_KEY,
                               REFRESH_TOKEN_LIFETIME)
 from datetime import datetime, timedelta
 from app.encription import encrypt_data, decrypt_data
+from app.passwords import password_hasher
+from app.db.user_cache import user_cache, CurrentUser
+from app.db.refresh_tokens import hash_token, consume_token_query
 import bcrypt
+import secrets
 
 
 #//////////////////////////////////////////////////////////////////////
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-auth_router = APIRouter(prefix='/auth', tags=['Auth'])
-
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+auth_router = APIRouter(prefix='/auth', tags=['Auth'], route_class=SessionRoute)
 
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# bcrypt считается в пуле потоков (app/passwords.py), event loop не блокируется
+async def verify_password(plain_password, hashed_password):
+    return await password_hasher.verify_and_update(plain_password, hashed_password)
 
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    return await password_hasher.hash(password)
 
 
-def create_access_token(data:dict, expires_delta: Optional[timedelta] = None):
+def create_access_token(data:dict, expires_delta: Optional[timedelta] = None, token_type: str = 'access'):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=ACCESS_TOKEN_LIFETIME))
-    to_encode.update({'exp': expire})
+    # type - чтобы refresh токен нельзя было предъявить вместо access
+    to_encode.update({'exp': expire, 'type': token_type})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 #refresh token
 def create_refresh_token(data: dict):
-    return create_access_token(data, expires_delta=timedelta(days=REFRESH_TOKEN_LIFETIME))
+    # jti - иначе два токена одного пользователя в одну секунду совпадут, а хеш в базе уникальный
+    return create_access_token({**data, 'jti': secrets.token_urlsafe(16)},
+                               expires_delta=timedelta(days=REFRESH_TOKEN_LIFETIME), token_type='refresh')
+
+
+credentials_exception = HTTPException(status_code=401, detail='Could not validate credentials',
+                                      headers={'WWW-Authenticate': 'Bearer'})
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme),
+                           db: AsyncSession = Depends(get_db)) -> CurrentUser:
+    # повторный запрос с тем же токеном: ни jwt.decode, ни запроса в базу
+    cached = user_cache.token_subject(token)
+    if cached is None:
+        try:
+            claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            raise credentials_exception
+        if claims.get('type') != 'access' or not claims.get('sub'):
+            raise credentials_exception
+        user = await db.scalar(select(UserProfile).where(UserProfile.user_name == claims['sub']))
+        if user is None:
+            raise credentials_exception
+        user_cache.remember_token(token, user.id, claims['sub'], claims.get('exp'))
+        return user_cache.remember_profile(user)
+
+    user_id, sub = cached
+    current_user = user_cache.profile(user_id)
+    if current_user is None:
+        user = await db.get(UserProfile, user_id)
+        if user is None:
+            raise credentials_exception
+        current_user = user_cache.remember_profile(user)
+    # токен выдан на прежний user_name - пользователя переименовали
+    if current_user.user_name != sub:
+        user_cache.forget_token(token)
+        raise credentials_exception
+    return current_user
 
 
 
 @auth_router.post('/register', response_model=dict)
-async def register(user:UserProfileCreateSchema, db: Session = Depends(get_db)):
+async def register(user:UserProfileCreateSchema, db: AsyncSession = Depends(get_db)):
     # Проверка по имени пользователя
-    if db.query(UserProfile).filter(UserProfile.user_name == user.user_name).first():#вход по user_name для теста api, если сделать по email, то будет зашифрован email
+    if await db.scalar(select(UserProfile).where(UserProfile.user_name == user.user_name)):#вход по user_name для теста api, если сделать по email, то будет зашифрован email
         raise HTTPException(status_code=400, detail="user_name уже существует")
 
     # Шифруем email и телефон
@@ -60,11 +95,12 @@ async def register(user:UserProfileCreateSchema, db: Session = Depends(get_db)):
     encrypted_phone = encrypt_data(user.phone_number) if user.phone_number else None
 
     # Проверка по зашифрованному email
-    if db.query(UserProfile).filter(UserProfile.email == encrypted_email).first():
+    if await db.scalar(select(UserProfile).where(UserProfile.email == encrypted_email)):
         raise HTTPException(status_code=400, detail="email уже существует")
 
-    # Хешируем пароль
-    hash_password = get_password_hash(user.password)
+    # Хешируем пароль, соединение на это время отдаём в пул
+    await db.commit()
+    hash_password = await get_password_hash(user.password)
 
     # Создаем пользователя с зашифрованными данными
     user_db = UserProfile(
@@ -78,47 +114,71 @@ async def register(user:UserProfileCreateSchema, db: Session = Depends(get_db)):
         password=hash_password
     )
     db.add(user_db)
-    db.commit()
-    db.refresh(user_db)
+    await db.commit()
+    await db.refresh(user_db)
 
     return {"message": "Вы успешно зарегистрировались", "user_id": user_db.id}
 
 
 @auth_router.post('/login')
 async def login(form_data: UserProfileLoginSchema = Depends(),
-                db: Session = Depends(get_db)):
+                db: AsyncSession = Depends(get_db)):
 
-    user = db.query(UserProfile).filter(UserProfile.user_name == form_data.user_name).first()
+    user = await db.scalar(select(UserProfile).where(UserProfile.user_name == form_data.user_name))
 
-    if not user or not verify_password(form_data.password, user.password):
+    if not user:
         raise HTTPException(status_code=401, detail='Данные логина неправильные')
 
+    # соединение не держим, пока считается bcrypt
+    await db.commit()
+    valid, new_hash = await verify_password(form_data.password, user.password)
+    if not valid:
+        raise HTTPException(status_code=401, detail='Данные логина неправильные')
+    if new_hash:
+        # хеш со старой стоимостью (PASSWORD_BCRYPT_ROUNDS поменяли) - сохраняем пересчитанный
+        user.password = new_hash
+
     access_token = create_access_token({"sub": user.user_name})
     refresh_token = create_refresh_token({"sub": user.user_name})
 
-    new_token = RefreshToken(user_id=user.id, token=refresh_token)
+    new_token = RefreshToken(user_id=user.id, token_hash=hash_token(refresh_token))
     db.add(new_token)
-    db.commit()
+    await db.commit()
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
 @auth_router.post('/logout')
-async def logout(refresh_token: str, db: Session = Depends(get_db)):
-    stored_token = db.query(RefreshToken).filter(RefreshToken.token == refresh_token).first()
-
-    if not stored_token:
+async def logout(refresh_token: str, db: AsyncSession = Depends(get_db)):
+    # отзыв - строка удаляется, этим токеном больше не обновиться
+    if await db.scalar(consume_token_query(refresh_token)) is None:
         raise HTTPException(status_code=401, detail='Данные логина неправильные')
 
-    db.add(stored_token)
-    db.commit()
+    await db.commit()
     return {"message": "Вы успешно вышли"}
 
 
 @auth_router.post('/refresh')
-async def refresh(refresh_token: str, db: Session = Depends(get_db)):
-    stored_token = db.query(RefreshToken).filter(RefreshToken.token == refresh_token).first()
-    if not stored_token:
+async def refresh(refresh_token: str, db: AsyncSession = Depends(get_db)):
+    try:
+        claims = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
         raise HTTPException(status_code=401, detail='Данные логина неправильные')
+    if claims.get('type') != 'refresh':
+        raise HTTPException(status_code=401, detail='Данные логина неправильные')
+
+    # ротация: старый токен одноразовый, удаляется вместе с выдачей нового
+    user_id = await db.scalar(consume_token_query(refresh_token))
+    user = await db.get(UserProfile, user_id) if user_id is not None else None
+    if user is None:
+        raise HTTPException(status_code=401, detail='Данные логина неправильные')
+
+    access_token = create_access_token({"sub": user.user_name})
+    new_refresh_token = create_refresh_token({"sub": user.user_name})
+    db.add(RefreshToken(user_id=user.id, token_hash=hash_token(new_refresh_token)))
+    await db.commit()
+    return {"access_token": access_token, "refresh_token": new_refresh_token, "token_type": "bearer"}
+
 
-    access_token = create_access_token({"sub": stored_token.id})
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+@auth_router.get('/me', response_model=CurrentUserSchema)
+async def me(current_user: CurrentUser = Depends(get_current_user)):
+    return current_user
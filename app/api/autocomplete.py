@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Query
+from typing import List, Literal, Optional
+from app.db.autocomplete_index import autocomplete_index
+from app.db.schemas import AutocompleteItemSchema
+
+
+# в базу не ходит - отвечает из индекса в памяти, поэтому без SessionRoute
+autocomplete_router = APIRouter(prefix="/autocomplete", tags=["Autocomplete"])
+
+
+@autocomplete_router.get("/", response_model=List[AutocompleteItemSchema])
+async def autocomplete(q: str = Query(..., min_length=1, max_length=100),
+                       kind: Optional[Literal['country', 'city', 'hotel']] = None,
+                       limit: int = Query(10, ge=1, le=50)):
+    return autocomplete_index.search(q, limit, kind)
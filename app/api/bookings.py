@@ -1,65 +1,227 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from app.db.models import Booking
-from app.db.schemas import (BookingOutSchema , BookingCreateSchema,
-                            BookingUpdateSchema, BookingDetailSchema)
-from app.db.database import SessionLocal
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy import select, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date
+from app.db.models import Booking, Room, Hotel, UserProfile, BookingStatus
+from app.db.schemas import (Page, BookingOutSchema , BookingCreateSchema,
+                            BookingUpdateSchema, BookingDetailSchema,
+                            BookingBulkCreateSchema)
+from app.db.database import get_db, SessionRoute, engine
+from app.db.pagination import PageParams, paginate
+from app.db.availability import (conflicting_booking_query, insert_booking_if_free, update_booking_if_free,
+                                  bookings_for_rooms_query, is_overlap_violation)
+from app.db.availability_index import availability_index
+from app.db.export import ExportFormat, export_response
 
 
 
-booking_router = APIRouter(prefix="/bookings", tags=["Bookings"])
+booking_router = APIRouter(prefix="/bookings", tags=["Bookings"], route_class=SessionRoute)
 
 
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def check_dates(check_in: date, check_out: date):
+    if check_in is None or check_out is None or check_out <= check_in:
+        raise HTTPException(status_code=400, detail="check_out must be after check_in")
 
 
-@booking_router.post("/", response_model=BookingOutSchema)
-async def create_booking(booking_data: BookingCreateSchema, db: Session = Depends(get_db)):
-    new_booking = Booking(**booking_data.dict())
+async def booking_conflict(db: AsyncSession, room_id: int, check_in: date, check_out: date,
+                           exclude_id: Optional[int] = None):
+    conflict = await db.scalar(conflicting_booking_query(room_id, check_in, check_out, exclude_id))
+    if conflict is None:
+        return None
+    return HTTPException(status_code=409, detail={
+        "message": "Room is already booked for these dates",
+        "conflict": BookingOutSchema.model_validate(conflict).model_dump(mode='json'),
+    })
 
-    db.add(new_booking)
-    db.commit()
-    db.refresh(new_booking)
-    return new_booking
 
+@booking_router.post("/", response_model=BookingOutSchema)
+async def create_booking(booking_data: BookingCreateSchema, db: AsyncSession = Depends(get_db)):
+    check_dates(booking_data.check_in, booking_data.check_out)
 
-@booking_router.get("/", response_model=List[BookingOutSchema])
-async def list_booking(db: Session = Depends(get_db)):
-    return db.query(Booking).all()
+    try:
+        booking_id = await db.scalar(insert_booking_if_free(booking_data.dict()))
+        await db.commit()
+    except IntegrityError:
+        # параллельная бронь успела раньше (exclusion constraint) или битый hotel_id/room_id/user_id
+        await db.rollback()
+        booking_id = None
+
+    if booking_id is None:
+        conflict = await booking_conflict(db, booking_data.room_id,
+                                          booking_data.check_in, booking_data.check_out)
+        raise conflict or HTTPException(status_code=400, detail="Booking not created")
+
+    availability_index.add_booking(booking_data.room_id, booking_data.check_in,
+                                   booking_data.check_out, booking_data.booking_status)
+    return await db.get(Booking, booking_id)
+
+
+def overlaps(a, b) -> bool:
+    return a.check_in < b.check_out and b.check_in < a.check_out
+
+
+async def missing_references(db: AsyncSession, items) -> list:
+    # несуществующие id проверяем заранее: иначе это IntegrityError внешнего ключа,
+    # неотличимый по смыслу от конфликта дат
+    errors = []
+    for model, field, name in ((Hotel, 'hotel_id', 'Hotel'), (Room, 'room_id', 'Room'), (UserProfile, 'user_id', 'User')):
+        ids = {getattr(item, field) for item in items}
+        found = set((await db.scalars(select(model.id).where(model.id.in_(ids)))).all())
+        errors += [{"index": index, "reason": f"{name} {getattr(item, field)} not found"}
+                   for index, item in enumerate(items) if getattr(item, field) not in found]
+    return errors
+
+
+@booking_router.post("/bulk/", response_model=List[BookingOutSchema])
+async def create_booking_bulk(bulk_data: BookingBulkCreateSchema, db: AsyncSession = Depends(get_db)):
+    items = bulk_data.bookings
+
+    errors = [{"index": index, "reason": "check_out must be after check_in"}
+              for index, item in enumerate(items) if item.check_out <= item.check_in]
+    if errors:
+        raise HTTPException(status_code=400, detail={"message": "Invalid bookings", "errors": errors})
+
+    missing = await missing_references(db, items)
+    if missing:
+        raise HTTPException(status_code=404, detail={"message": "Bookings not created", "errors": missing})
+
+    active = [(index, item) for index, item in enumerate(items)
+              if item.booking_status != BookingStatus.cancelled]
+    room_ids = sorted({item.room_id for _, item in active})
+    conflicts = []
+
+    if active:
+        # блокируем строки комнат всегда в одном порядке - две пачки не словят deadlock
+        await db.execute(select(Room.id).where(Room.id.in_(room_ids)).order_by(Room.id).with_for_update())
+        existing = (await db.scalars(bookings_for_rooms_query(
+            room_ids,
+            min(item.check_in for _, item in active),
+            max(item.check_out for _, item in active),
+        ))).all()
+
+        for position, (index, item) in enumerate(active):
+            clash = next((booking for booking in existing
+                          if booking.room_id == item.room_id and overlaps(booking, item)), None)
+            if clash is not None:
+                conflicts.append({"index": index, "reason": "Room is already booked for these dates",
+                                  "conflict": BookingOutSchema.model_validate(clash).model_dump(mode='json')})
+                continue
+            # пересечения внутри самой пачки
+            twin = next((other_index for other_index, other in active[:position]
+                         if other.room_id == item.room_id and overlaps(other, item)), None)
+            if twin is not None:
+                conflicts.append({"index": index, "reason": f"Overlaps booking #{twin} in this request"})
+
+    if conflicts:
+        raise HTTPException(status_code=409, detail={"message": "Bookings not created", "conflicts": conflicts})
+
+    values = [item.dict() for item in items]
+    try:
+        if engine.dialect.name == 'postgresql':
+            # один INSERT на всю пачку (insertmanyvalues) и один commit; строки комнат заблокированы выше,
+            # гонку с одиночными бронями закрывает exclusion constraint
+            new_bookings = (await db.scalars(insert(Booking).returning(Booking, sort_by_parameter_order=True),
+                                             values)).all()
+        else:
+            # в sqlite FOR UPDATE ничего не блокирует: каждая позиция - INSERT ... WHERE NOT EXISTS,
+            # первая вставка берёт блокировку записи базы до commit, чужие брони между позициями не влезут
+            booking_ids = []
+            for index, item_values in enumerate(values):
+                booking_id = await db.scalar(insert_booking_if_free(item_values))
+                if booking_id is None:
+                    await db.rollback()
+                    raise HTTPException(status_code=409, detail={"message": "Bookings not created", "conflicts": [
+                        {"index": index, "reason": "Room is already booked for these dates"}]})
+                booking_ids.append(booking_id)
+            by_id = {booking.id: booking for booking in
+                     (await db.scalars(select(Booking).where(Booking.id.in_(booking_ids)))).all()}
+            new_bookings = [by_id[booking_id] for booking_id in booking_ids]
+        await db.commit()
+    except IntegrityError as error:
+        await db.rollback()
+        if is_overlap_violation(error):
+            # параллельная бронь успела между проверкой и вставкой
+            raise HTTPException(status_code=409, detail={"message": "Bookings not created, retry the request"})
+        raise HTTPException(status_code=400, detail={"message": "Bookings not created"})
+
+    for booking in new_bookings:
+        availability_index.add_booking(booking.room_id, booking.check_in,
+                                       booking.check_out, booking.booking_status)
+    return new_bookings
+
+
+@booking_router.get("/", response_model=Page[BookingOutSchema])
+async def list_booking(page: PageParams = Depends(), db: AsyncSession = Depends(get_db)):
+    return await paginate(db, select(Booking), page, Booking.id)
+
+
+@booking_router.get("/export/")
+async def export_bookings(export_format: ExportFormat = Query(ExportFormat.csv, alias="format"),
+                          hotel_id: Optional[int] = None,
+                          date_from: Optional[date] = None,
+                          date_to: Optional[date] = None,
+                          booking_status: Optional[BookingStatus] = None,
+                          db: AsyncSession = Depends(get_db)):
+    # бронь попадает в выгрузку, если её даты пересекают [date_from, date_to)
+    query = select(*Booking.__table__.columns).order_by(Booking.id)
+    if hotel_id is not None:
+        query = query.where(Booking.hotel_id == hotel_id)
+    if date_from is not None:
+        query = query.where(Booking.check_out > date_from)
+    if date_to is not None:
+        query = query.where(Booking.check_in < date_to)
+    if booking_status is not None:
+        query = query.where(Booking.booking_status == booking_status)
+    return export_response(db, query, export_format, "bookings")
 
 
 @booking_router.get("/{booking_id}/", response_model=BookingDetailSchema)
-async def detail_booking(booking_id: int, db: Session = Depends(get_db)):
-    booking_db = db.query(Booking).filter(Booking.id == booking_id).first()
+async def detail_booking(booking_id: int, db: AsyncSession = Depends(get_db)):
+    booking_db = await db.get(Booking, booking_id)
     if not booking_db:
         raise HTTPException(status_code=404, detail="Booking not found")
     return booking_db
 
 
 @booking_router.put("/{booking_id}/", response_model=BookingOutSchema)
-async def update_booking(booking_data: BookingDetailSchema, booking_id: int, db: Session = Depends(get_db)):
-    booking_db = db.query(Booking).filter(Booking.id == booking_id).first()
+async def update_booking(booking_data: BookingDetailSchema, booking_id: int, db: AsyncSession = Depends(get_db)):
+    booking_db = await db.get(Booking, booking_id)
     if not booking_db:
         raise HTTPException(status_code=404, detail="Booking not found")
-    booking_db.check_in = booking_data.check_in
-    booking_db.check_out = booking_data.check_out
-    booking_db.booking_status = booking_data.booking_status
-    db.commit()
-    db.refresh(booking_db)
+    check_dates(booking_data.check_in, booking_data.check_out)
+    room_id = booking_db.room_id
+    old_booking = (booking_db.check_in, booking_db.check_out, booking_db.booking_status)
+
+    values = {'check_in': booking_data.check_in, 'check_out': booking_data.check_out,
+              'booking_status': booking_data.booking_status}
+    try:
+        # как в create_booking: в sqlite FOR UPDATE нет, поэтому проверка пересечения - в самом UPDATE
+        updated_id = await db.scalar(update_booking_if_free(booking_id, room_id, values))
+        await db.commit()
+    except IntegrityError:
+        # параллельная бронь успела раньше (exclusion constraint в postgres)
+        await db.rollback()
+        updated_id = None
+
+    if updated_id is None:
+        conflict = await booking_conflict(db, room_id, booking_data.check_in,
+                                          booking_data.check_out, exclude_id=booking_id)
+        raise conflict or HTTPException(status_code=400, detail="Booking not updated")
+    await db.refresh(booking_db)
+    availability_index.remove_booking(room_id, *old_booking)
+    availability_index.add_booking(room_id, booking_db.check_in, booking_db.check_out, booking_db.booking_status)
     return booking_db
 
 
 @booking_router.delete("/{booking_id}/")
-async def delete_booking(booking_id: int, db: Session = Depends(get_db)):
-    booking_db = db.query(Booking).filter(Booking.id == booking_id).first()
+async def delete_booking(booking_id: int, db: AsyncSession = Depends(get_db)):
+    booking_db = await db.get(Booking, booking_id)
     if not booking_db:
         raise HTTPException(status_code=404, detail="Booking not found")
-    db.delete(booking_db)
-    db.commit()
+    await db.delete(booking_db)
+    await db.commit()
+    availability_index.remove_booking(booking_db.room_id, booking_db.check_in,
+                                      booking_db.check_out, booking_db.booking_status)
     return {"message": f"Booking {booking_id} deleted successfully"}
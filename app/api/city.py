@@ -1,41 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_db, SessionLocal
+from app.db.reference_cache import reference_cache
+from app.db.response_cache import CachedRoute, cache_response, invalidate_cache
+from app.db.pagination import PageParams, paginate
+from app.db.conditional import conditional_collection, conditional_row
 from app.db.models import City
-from app.db.schemas import CityCreate, CityOut
-from typing import List
+from app.db.autocomplete_index import autocomplete_index
+from app.db.schemas import Page, CityCreate, CityOut
+from app.db.coalesce import coalesce_requests
 
 
-city_router = APIRouter(prefix="/cities", tags=["Cities"])
+city_router = APIRouter(prefix="/cities", tags=["Cities"], route_class=CachedRoute)
 
 
 @city_router.post('/', response_model=CityOut)
-async def create_city(city: CityCreate, db: Session = Depends(get_db)):
+@invalidate_cache('city')
+async def create_city(city: CityCreate, db: AsyncSession = Depends(get_db)):
     new_city = City(city_name=city.city_name, city_image=city.city_image)
 
     db.add(new_city)
-    db.commit()
-    db.refresh(new_city)
+    await db.commit()
+    await db.refresh(new_city)
+    autocomplete_index.set('city', new_city.id, new_city.city_name)
+    await reference_cache.changed(SessionLocal, 'city')
     return new_city
 
 
-@city_router.get('/', response_model=List[CityOut])
-async def list_cities(db: Session = Depends(get_db)):
-    return db.query(City).all()
+@city_router.get('/', response_model=Page[CityOut])
+@cache_response('city')
+@coalesce_requests
+async def list_cities(request: Request, page: PageParams = Depends(), db: AsyncSession = Depends(get_db)):
+    not_modified = await conditional_collection(request, db, City)
+    if not_modified:
+        return not_modified
+    return await paginate(db, select(City), page, City.id)
 
 
 @city_router.get('/{city_id}/', response_model=CityOut)
-async def detail_city(city_id: int, db: Session = Depends(get_db)):
-    city = db.query(City).filter(City.id == city_id).first()
+async def detail_city(city_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    city = reference_cache.city(city_id) or await db.get(City, city_id)
 
     if not city:
         raise HTTPException(status_code=404, detail='City not found')
-    return city
+    return conditional_row(request, city) or city
 
 
 @city_router.put('/{city_id}/', response_model=CityOut)
-async def update_city(city_id: int, city_data: CityCreate, db: Session = Depends(get_db)):
-    city = db.query(City).filter(City.id == city_id).first()
+@invalidate_cache('city')
+async def update_city(city_id: int, city_data: CityCreate, db: AsyncSession = Depends(get_db)):
+    city = await db.get(City, city_id)
 
     if not city:
         raise HTTPException(status_code=404, detail='City not found')
@@ -43,18 +58,23 @@ async def update_city(city_id: int, city_data: CityCreate, db: Session = Depends
     city.city_name = city_data.city_name
     city.city_image = city_data.city_image
 
-    db.commit()
-    db.refresh(city)
+    await db.commit()
+    await db.refresh(city)
+    autocomplete_index.set('city', city.id, city.city_name)
+    await reference_cache.changed(SessionLocal, 'city')
     return city
 
 
 @city_router.delete('/{city_id}/')
-async def delete_city(city_id: int, db: Session = Depends(get_db)):
-    city = db.query(City).filter(City.id == city_id).first()
+@invalidate_cache('city')
+async def delete_city(city_id: int, db: AsyncSession = Depends(get_db)):
+    city = await db.get(City, city_id)
 
     if not city:
         raise HTTPException(status_code=404, detail="City not found")
 
-    db.delete(city)
-    db.commit()
+    await db.delete(city)
+    await db.commit()
+    autocomplete_index.remove('city', city_id)
+    await reference_cache.changed(SessionLocal, 'city')
     return {'message': f'City {city_id} deleted successfully'}
\ No newline at end of file
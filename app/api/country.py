@@ -1,55 +1,62 @@
-from fastapi import HTTPException, Depends, APIRouter
+from fastapi import HTTPException, Depends, APIRouter, Request
 from app.db.models import Country
-from app.db.schemas import CountryOutSchema, CountryUpdateSchema, CountryCreateSchema
-from app.db.database import SessionLocal
-from sqlalchemy.orm import Session
-from typing import List
+from app.db.autocomplete_index import autocomplete_index
+from app.db.schemas import Page, CountryOutSchema, CountryUpdateSchema, CountryCreateSchema
+from app.db.database import get_db, SessionLocal
+from app.db.reference_cache import reference_cache
+from app.db.response_cache import CachedRoute, cache_response, invalidate_cache
+from app.db.pagination import PageParams, paginate
+from app.db.conditional import conditional_collection, conditional_row
+from app.db.coalesce import coalesce_requests
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-
-country_router = APIRouter(prefix='/country', tags=['Country'])
+country_router = APIRouter(prefix='/country', tags=['Country'], route_class=CachedRoute)
 
 
 @country_router.post('/', response_model=CountryOutSchema)
-async def create_country(country_data: CountryCreateSchema, db: Session = Depends(get_db)):
+@invalidate_cache('country')
+async def create_country(country_data: CountryCreateSchema, db: AsyncSession = Depends(get_db)):
 
     new_country = Country(country_name=country_data.country_name,
                           country_image=country_data.country_image)
 
     db.add(new_country)
-    db.commit()
-    db.refresh(new_country)
+    await db.commit()
+    await db.refresh(new_country)
+    autocomplete_index.set('country', new_country.id, new_country.country_name)
+    await reference_cache.changed(SessionLocal, 'country')
     return new_country
 
 
 
-@country_router.get('/', response_model=List[CountryOutSchema])
-async def list_country(db: Session = Depends(get_db)):
-    return db.query(Country).all()
+@country_router.get('/', response_model=Page[CountryOutSchema])
+@cache_response('country')
+@coalesce_requests
+async def list_country(request: Request, page: PageParams = Depends(), db: AsyncSession = Depends(get_db)):
+    not_modified = await conditional_collection(request, db, Country)
+    if not_modified:
+        return not_modified
+    return await paginate(db, select(Country), page, Country.id)
 
 
 @country_router.get('/{country_id}/', response_model=CountryOutSchema)
-async def detail_country(country_id: int, db: Session = Depends(get_db)):
-    country_db = db.query(Country).filter(Country.id == country_id).first()
+async def detail_country(country_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    # справочник из памяти, в базу - только если этот воркер ещё не узнал о новой записи
+    country_db = reference_cache.country(country_id) or await db.get(Country, country_id)
 
     if country_db is None:
         raise HTTPException(status_code=404, detail='Country not found')
-    return country_db
+    return conditional_row(request, country_db) or country_db
 
 
 
 @country_router.put('/{country_id}/', response_model=CountryOutSchema)
+@invalidate_cache('country')
 async def update_country(country_data: CountryUpdateSchema, country_id: int,
-                         db: Session = Depends(get_db)):
-    country_db = db.query(Country).filter(Country.id == country_id).first()
+                         db: AsyncSession = Depends(get_db)):
+    country_db = await db.get(Country, country_id)
 
     if country_db is None:
         raise HTTPException(status_code=404, detail='Country not updated')
@@ -57,22 +64,27 @@ async def update_country(country_data: CountryUpdateSchema, country_id: int,
     country_db.country_name =  country_data.country_name
     country_db.country_image = country_data.country_image
 
-    db.commit()
-    db.refresh(country_db)
+    await db.commit()
+    await db.refresh(country_db)
+    autocomplete_index.set('country', country_db.id, country_db.country_name)
+    await reference_cache.changed(SessionLocal, 'country')
 
     return country_db
 
 
 
 @country_router.delete('/{country_id}/')
-async def delete_country(country_id: int, db: Session = Depends(get_db)):
-    country_db = db.query(Country).filter(Country.id == country_id).first()
+@invalidate_cache('country')
+async def delete_country(country_id: int, db: AsyncSession = Depends(get_db)):
+    country_db = await db.get(Country, country_id)
 
     if country_db is None:
         raise HTTPException(status_code=404, detail='User not found')
 
-    db.delete(country_db)
-    db.commit()
+    await db.delete(country_db)
+    await db.commit()
+    autocomplete_index.remove('country', country_id)
+    await reference_cache.changed(SessionLocal, 'country')
     return {'message': f'Country {country_id} deleted successfully'}
 
 
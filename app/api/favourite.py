@@ -1,39 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models import Favourite
-from app.db.schemas import FavouriteOutSchema, FavouriteCreateSchema, FavouriteDetailSchema, FavouriteUpdateSchema
-from app.db.database import SessionLocal
-
-favourite_router = APIRouter(prefix="/favourite", tags=["Favourite"])
-
-
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+from app.db.schemas import Page, FavouriteOutSchema, FavouriteCreateSchema, FavouriteDetailSchema, FavouriteUpdateSchema
+from app.db.database import get_db, SessionRoute
+from app.db.pagination import PageParams, paginate
 
+favourite_router = APIRouter(prefix="/favourite", tags=["Favourite"], route_class=SessionRoute)
 
 
 @favourite_router.post("/", response_model=FavouriteOutSchema)
-async def create_favourite(favourite_data: FavouriteCreateSchema, db: Session = Depends(get_db)):
+async def create_favourite(favourite_data: FavouriteCreateSchema, db: AsyncSession = Depends(get_db)):
     new_favourite = Favourite(user_id=favourite_data.user_id)
     db.add(new_favourite)
-    db.commit()
-    db.refresh(new_favourite)
+    await db.commit()
+    await db.refresh(new_favourite)
     return new_favourite
 
 
-@favourite_router.get("/", response_model=List[FavouriteOutSchema])
-async def list_favourites(db: Session = Depends(get_db)):
-    return db.query(Favourite).all()
+@favourite_router.get("/", response_model=Page[FavouriteOutSchema])
+async def list_favourites(page: PageParams = Depends(), db: AsyncSession = Depends(get_db)):
+    return await paginate(db, select(Favourite), page, Favourite.id)
 
 
 @favourite_router.get("/{favourite_id}/", response_model=FavouriteCreateSchema)
-async def detail_favourite(favourite_id: int, db: Session = Depends(get_db)):
-    favourite_db = db.query(Favourite).filter(Favourite.id == favourite_id).first()
+async def detail_favourite(favourite_id: int, db: AsyncSession = Depends(get_db)):
+    favourite_db = await db.get(Favourite, favourite_id)
     if not favourite_db:
         raise HTTPException(status_code=404, detail="Favourite not found")
     return favourite_db
@@ -41,24 +33,24 @@ async def detail_favourite(favourite_id: int, db: Session = Depends(get_db)):
 
 
 @favourite_router.put("/{favourite_id}/", response_model=FavouriteOutSchema)
-async def update_favourite(favourite_data: FavouriteUpdateSchema, favourite_id: int, db: Session = Depends(get_db)):
-    favourite_db = db.query(Favourite).filter(Favourite.id == favourite_id).first()
+async def update_favourite(favourite_data: FavouriteUpdateSchema, favourite_id: int, db: AsyncSession = Depends(get_db)):
+    favourite_db = await db.get(Favourite, favourite_id)
     if not favourite_db:
         raise HTTPException(status_code=404, detail="Favourite not found")
 
     favourite_db.user_id = favourite_data.user_id
-    db.commit()
-    db.refresh(favourite_db)
+    await db.commit()
+    await db.refresh(favourite_db)
     return favourite_db
 
 
 
 @favourite_router.delete("/{favourite_id}/")
-async def delete_favourite(favourite_id: int, db: Session = Depends(get_db)):
-    favourite_db = db.query(Favourite).filter(Favourite.id == favourite_id).first()
+async def delete_favourite(favourite_id: int, db: AsyncSession = Depends(get_db)):
+    favourite_db = await db.get(Favourite, favourite_id)
     if not favourite_db:
         raise HTTPException(status_code=404, detail="Favourite not found")
-    db.delete(favourite_db)
-    db.commit()
+    await db.delete(favourite_db)
+    await db.commit()
     return {"message": f"Favourite {favourite_id} deleted successfully"}
 
@@ -1,43 +1,36 @@
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models import FavouriteItem
-from app.db.schemas import (FavouriteItemOutSchema, FavouriteItemCreateSchema,
+from app.db.schemas import (Page, FavouriteItemOutSchema, FavouriteItemCreateSchema,
                             FavouriteItemUpdateSchema, FavouriteItemDetailSchema)
-from app.db.database import SessionLocal
+from app.db.database import get_db, SessionRoute
+from app.db.pagination import PageParams, paginate
 
 
-favouriteitem_router = APIRouter(prefix="/favouriteitem", tags=["FavouriteItem"])
-
-
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+favouriteitem_router = APIRouter(prefix="/favouriteitem", tags=["FavouriteItem"], route_class=SessionRoute)
 
 
 @favouriteitem_router.post("/", response_model=FavouriteItemOutSchema)
-async def create_favourite_item(favourite_item_data: FavouriteItemCreateSchema, db: Session = Depends(get_db)):
+async def create_favourite_item(favourite_item_data: FavouriteItemCreateSchema, db: AsyncSession = Depends(get_db)):
     new_favourite_item = FavouriteItem(
         favourite_id=favourite_item_data.favourite_id,
         hotel_id=favourite_item_data.hotel_id
     )
     db.add(new_favourite_item)
-    db.commit()
-    db.refresh(new_favourite_item)
+    await db.commit()
+    await db.refresh(new_favourite_item)
     return new_favourite_item
 
 
-@favouriteitem_router.get("/", response_model=List[FavouriteItemOutSchema])
-async def list_favourite_item(db: Session = Depends(get_db)):
-    return db.query(FavouriteItem).all()
+@favouriteitem_router.get("/", response_model=Page[FavouriteItemOutSchema])
+async def list_favourite_item(page: PageParams = Depends(), db: AsyncSession = Depends(get_db)):
+    return await paginate(db, select(FavouriteItem), page, FavouriteItem.id)
 
 
 @favouriteitem_router.get("/{favouriteitem_id}/", response_model=FavouriteItemDetailSchema)
-async def detail_favourite_item(favouriteitem_id: int, db: Session = Depends(get_db)):
-    favourite_item_db = db.query(FavouriteItem).filter(FavouriteItem.id == favouriteitem_id).first()
+async def detail_favourite_item(favouriteitem_id: int, db: AsyncSession = Depends(get_db)):
+    favourite_item_db = await db.get(FavouriteItem, favouriteitem_id)
     if not favourite_item_db:
         raise HTTPException(status_code=404, detail="Favourite item not found")
     return favourite_item_db
@@ -45,23 +38,23 @@ async def detail_favourite_item(favouriteitem_id: int, db: Session = Depends(get
 
 @favouriteitem_router.put("/{favouriteitem_id}/", response_model=FavouriteItemOutSchema)
 async def update_favourite_item(favourite_item_data: FavouriteItemUpdateSchema, favouriteitem_id: int,
-                                db: Session = Depends(get_db)):
-    favourite_item_db = db.query(FavouriteItem).filter(FavouriteItem.id == favouriteitem_id).first()
+                                db: AsyncSession = Depends(get_db)):
+    favourite_item_db = await db.get(FavouriteItem, favouriteitem_id)
     if not favourite_item_db:
         raise HTTPException(status_code=404, detail="Favourite item not found")
 
     favourite_item_db.favourite_id = favourite_item_data.favourite_id
     favourite_item_db.hotel_id = favourite_item_data.hotel_id
-    db.commit()
-    db.refresh(favourite_item_db)
+    await db.commit()
+    await db.refresh(favourite_item_db)
     return favourite_item_db
 
 
 @favouriteitem_router.delete("/{favouriteitem_id}/")
-async def delete_favourite_item(favouriteitem_id: int, db: Session = Depends(get_db)):
-    favourite_item_db = db.query(FavouriteItem).filter(FavouriteItem.id == favouriteitem_id).first()
+async def delete_favourite_item(favouriteitem_id: int, db: AsyncSession = Depends(get_db)):
+    favourite_item_db = await db.get(FavouriteItem, favouriteitem_id)
     if not favourite_item_db:
         raise HTTPException(status_code=404, detail="Favourite item not found")
-    db.delete(favourite_item_db)
-    db.commit()
+    await db.delete(favourite_item_db)
+    await db.commit()
     return {"message": f"Favourite item {favouriteitem_id} deleted successfully"}
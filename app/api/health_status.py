@@ -1,14 +1,10 @@
 from datetime import datetime
 from fastapi import APIRouter
-from app.db.database import SessionLocal
-
-
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+from app.db.database import engine, replica_engine
+from app.db.pool import pool_stats
+from app.db.coalesce import single_flight
+from app.passwords import password_hasher
+from app.db.user_cache import user_cache
 
 
 health_routers = APIRouter(prefix="/health", tags=["Health"])
@@ -21,3 +17,38 @@ async def health_check():
         "version": "1.0.0",
         "timestamp": datetime.utcnow().isoformat()
     }
+
+
+@health_routers.get("/pool/")
+async def pool_status():
+    return {
+        "primary": pool_stats(engine.pool),
+        "replica": pool_stats(replica_engine.pool) if replica_engine else None,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@health_routers.get("/coalescing/")
+async def coalescing_status():
+    # сколько одинаковых GET этого воркера получили чужой ответ вместо своего запроса в базу
+    return {
+        **single_flight.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@health_routers.get("/passwords/")
+async def password_hash_status():
+    # очередь bcrypt: растущий queue_depth и rejected - признак наплыва логинов
+    return {
+        **password_hasher.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@health_routers.get("/auth-cache/")
+async def auth_cache_status():
+    return {
+        **user_cache.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
@@ -1,50 +1,186 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from app.db.models import Hotel
-from app.db.schemas import (HotelOutSchema, HotelCreateSchema,
-                        HotelUpdateSchema, HotelDetailSchema)
-
-from app.db.database import SessionLocal
-
-hotel_router = APIRouter(prefix="/hotel", tags=["Hotel"])
-
-
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import date
+from app.db.models import Hotel, Review
+from app.db.availability import available_hotels_query
+from app.db.availability_index import availability_index
+from app.db.autocomplete_index import autocomplete_index
+from app.db.schemas import (Page, HotelOutSchema, HotelCreateSchema,
+                        HotelUpdateSchema, HotelDetailSchema, HotelSearchSchema,
+                        HotelNearbySchema, HotelFullSchema)
+
+from app.db.database import get_db
+from app.db.response_cache import CachedRoute, cache_response, invalidate_cache
+from app.db.pagination import (PageParams, paginate, paginate_candidates, make_page, sort_param,
+                               decode_cursor, encode_cursor)
+from app.db.fields import FieldsParam, SparseFields
+from app.db.conditional import conditional_row
+from app.db.search import hotel_search_query
+from app.db.geo import nearby_candidates_query, nearest
+from app.db.coalesce import coalesce_requests
+from app.config import NEARBY_DEFAULT_RADIUS_KM, NEARBY_MAX_RADIUS_KM, HOTEL_LATEST_REVIEWS
+
+hotel_router = APIRouter(prefix="/hotel", tags=["Hotel"], route_class=CachedRoute)
+
+# разрешённые ключи ?sort= (с "-" - по убыванию), под каждый есть индекс (..., id)
+HOTEL_SORTS = {'id': None, 'stars': Hotel.stars, 'hotel_name': Hotel.hotel_name, 'rating': Hotel.rating_avg}
 
 
 @hotel_router.post("/", response_model=HotelOutSchema)
-async def create_hotel(hotel_data: HotelCreateSchema, db: Session = Depends(get_db)):
+async def create_hotel(hotel_data: HotelCreateSchema, db: AsyncSession = Depends(get_db)):
     new_hotel = Hotel(**hotel_data.dict())
 
     db.add(new_hotel)
-    db.commit()
-    db.refresh(new_hotel)
+    await db.commit()
+    await db.refresh(new_hotel)
+    availability_index.set_hotel(new_hotel.id, new_hotel.city_id, new_hotel.country_id)
+    autocomplete_index.set('hotel', new_hotel.id, new_hotel.hotel_name)
     return new_hotel
 
 
-@hotel_router.get("/", response_model=List[HotelOutSchema])
-async def list_hotel(db: Session = Depends(get_db)):
-    return db.query(Hotel).all()
-
+@hotel_router.get("/", response_model=Page[HotelOutSchema])
+@coalesce_requests
+async def list_hotel(country_id: Optional[int] = None,
+                     city_id: Optional[int] = None,
+                     owner_id: Optional[int] = None,
+                     stars_min: Optional[int] = Query(None, ge=1, le=5),
+                     stars_max: Optional[int] = Query(None, ge=1, le=5),
+                     rating_min: Optional[float] = Query(None, ge=0, le=5),
+                     sort: str = 'id',
+                     page: PageParams = Depends(), fields: FieldsParam = Depends(),
+                     db: AsyncSession = Depends(get_db)):
+    sort_column, descending = sort_param(sort, HOTEL_SORTS)
+    sparse = SparseFields(Hotel, HotelOutSchema, fields, always=[sort_column])
+
+    query = select(Hotel).options(*sparse.options)
+    if country_id is not None:
+        query = query.where(Hotel.country_id == country_id)
+    if city_id is not None:
+        query = query.where(Hotel.city_id == city_id)
+    if owner_id is not None:
+        query = query.where(Hotel.owner_id == owner_id)
+    if stars_min is not None:
+        query = query.where(Hotel.stars >= stars_min)
+    if stars_max is not None:
+        query = query.where(Hotel.stars <= stars_max)
+    if rating_min is not None:
+        query = query.where(Hotel.rating_avg >= rating_min)
+    return sparse.page(await paginate(db, query, page, Hotel.id, sort_column, descending))
+
+
+@hotel_router.get("/available/", response_model=Page[HotelOutSchema])
+@coalesce_requests
+async def list_available_hotel(check_in: date, check_out: date,
+                               guests: Optional[int] = Query(None, gt=0),
+                               city_id: Optional[int] = None,
+                               country_id: Optional[int] = None,
+                               page: PageParams = Depends(),
+                               fields: FieldsParam = Depends(),
+                               db: AsyncSession = Depends(get_db)):
+    if check_out <= check_in:
+        raise HTTPException(status_code=400, detail="check_out must be after check_in")
+    sparse = SparseFields(Hotel, HotelOutSchema, fields)
+
+    query = available_hotels_query(check_in, check_out, guests, city_id, country_id)
+    if availability_index.covers(check_in, check_out):
+        # кандидаты из индекса воркера, перепроверка точным запросом (см. list_available_room)
+        hotel_ids = availability_index.free_hotels(check_in, check_out, city_id=city_id,
+                                                   country_id=country_id, guests=guests)
+        return sparse.page(await paginate_candidates(db, query.options(*sparse.options), Hotel.id, hotel_ids, page))
+
+    return sparse.page(await paginate(db, query.options(*sparse.options), page, Hotel.id))
+
+
+@hotel_router.get("/search/", response_model=Page[HotelSearchSchema])
+async def search_hotel(q: str = Query(..., min_length=1, max_length=200),
+                       page: PageParams = Depends(),
+                       db: AsyncSession = Depends(get_db)):
+    # по релевантности, курсор - (rank, id) последней строки
+    rows = (await db.execute(hotel_search_query(q, page))).all()
+    return make_page(rows, page, sort_attr='rank')
+
+
+@hotel_router.get("/nearby/", response_model=Page[HotelNearbySchema])
+async def nearby_hotel(lat: float = Query(..., ge=-90, le=90),
+                       lon: float = Query(..., ge=-180, le=180),
+                       radius: float = Query(NEARBY_DEFAULT_RADIUS_KM, gt=0, le=NEARBY_MAX_RADIUS_KM),
+                       page: PageParams = Depends(),
+                       db: AsyncSession = Depends(get_db)):
+    # radius в км, сортировка по расстоянию, курсор - (distance, id) последней строки
+    after = None
+    if page.after:
+        after = decode_cursor(page.after)
+        if len(after) != 2 or not all(isinstance(value, (int, float)) for value in after):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    candidates = (await db.execute(nearby_candidates_query(lat, lon, radius))).all()
+    ids, distances = nearest(candidates, lat, lon, radius, after)
+    ids, distances = ids[:page.limit + 1].tolist(), distances[:page.limit + 1].tolist()
+
+    next_cursor = None
+    if len(ids) > page.limit:
+        ids, distances = ids[:page.limit], distances[:page.limit]
+        next_cursor = encode_cursor([distances[-1], ids[-1]])
+
+    hotels = {hotel.id: hotel for hotel in (await db.scalars(select(Hotel).where(Hotel.id.in_(ids)))).all()} if ids else {}
+    items = [HotelNearbySchema(**HotelOutSchema.model_validate(hotels[hotel_id]).model_dump(),
+                               distance_km=round(distance, 3))
+             for hotel_id, distance in zip(ids, distances) if hotel_id in hotels]
+    return {"items": items, "next_cursor": next_cursor}
 
 
 @hotel_router.get("/{hotel_id}/", response_model=HotelDetailSchema)
-async def detail_hotel(hotel_id: int, db: Session = Depends(get_db)):
-    hotel_db = db.query(Hotel).filter(Hotel.id == hotel_id).first()
+@cache_response('hotel:{hotel_id}')
+@coalesce_requests
+async def detail_hotel(hotel_id: int, request: Request, fields: FieldsParam = Depends(),
+                       db: AsyncSession = Depends(get_db)):
+    sparse = SparseFields(Hotel, HotelDetailSchema, fields, always=[Hotel.updated_at])
+    hotel_db = await db.get(Hotel, hotel_id, options=sparse.options)
     if not hotel_db:
         raise HTTPException(status_code=404, detail="Hotel not found")
-    return hotel_db
+    return conditional_row(request, hotel_db) or sparse.one(hotel_db)
+
+
+@hotel_router.get("/{hotel_id}/full/", response_model=HotelFullSchema)
+@coalesce_requests
+async def full_hotel(hotel_id: int, db: AsyncSession = Depends(get_db)):
+    # всё для страницы отеля за фиксированное число запросов: отель + 3 selectin + последние отзывы,
+    # рейтинг уже лежит в колонках отеля
+    hotel_db = await db.scalar(
+        select(Hotel).where(Hotel.id == hotel_id).options(
+            selectinload(Hotel.hotel_images),
+            selectinload(Hotel.services),
+            selectinload(Hotel.rooms),
+        )
+    )
+    if not hotel_db:
+        raise HTTPException(status_code=404, detail="Hotel not found")
+
+    latest_reviews = (await db.scalars(
+        select(Review).where(Review.hotel_id == hotel_id).order_by(Review.id.desc()).limit(HOTEL_LATEST_REVIEWS)
+    )).all()
+
+    return HotelFullSchema(
+        **HotelOutSchema.model_validate(hotel_db).model_dump(),
+        hotel_images=hotel_db.hotel_images,
+        services=hotel_db.services,
+        rooms=hotel_db.rooms,
+        rating={
+            "avg": round(hotel_db.rating_avg, 2) if hotel_db.rating_count else None,
+            "count": hotel_db.rating_count,
+            "histogram": {stars: getattr(hotel_db, f"rating_{stars}") for stars in range(1, 6)},
+        },
+        latest_reviews=latest_reviews,
+    )
 
 
 @hotel_router.put("/{hotel_id}/", response_model=HotelOutSchema)
-async def update_hotel(hotel_data: HotelUpdateSchema, hotel_id: int, db: Session = Depends(get_db)):
-    hotel_db = db.query(Hotel).filter(Hotel.id == hotel_id).first()
+@invalidate_cache('hotel:{hotel_id}')
+async def update_hotel(hotel_data: HotelUpdateSchema, hotel_id: int, db: AsyncSession = Depends(get_db)):
+    hotel_db = await db.get(Hotel, hotel_id)
     if not hotel_db:
         raise HTTPException(status_code=404, detail="Hotel not found")
     hotel_db.hotel_name = hotel_data.hotel_name
@@ -55,16 +191,23 @@ async def update_hotel(hotel_data: HotelUpdateSchema, hotel_id: int, db: Session
     hotel_db.country_id = hotel_data.country_id
     hotel_db.city_id = hotel_data.city_id
     hotel_db.owner_id = hotel_data.owner_id
-    db.commit()
-    db.refresh(hotel_db)
+    hotel_db.latitude = hotel_data.latitude
+    hotel_db.longitude = hotel_data.longitude
+    await db.commit()
+    await db.refresh(hotel_db)
+    availability_index.set_hotel(hotel_db.id, hotel_db.city_id, hotel_db.country_id)
+    autocomplete_index.set('hotel', hotel_db.id, hotel_db.hotel_name)
     return hotel_db
 
 
 @hotel_router.delete("/{hotel_id}/")
-async def delete_hotel(hotel_id: int, db: Session = Depends(get_db)):
-    hotel_db = db.query(Hotel).filter(Hotel.id == hotel_id).first()
+@invalidate_cache('hotel:{hotel_id}')
+async def delete_hotel(hotel_id: int, db: AsyncSession = Depends(get_db)):
+    hotel_db = await db.get(Hotel, hotel_id)
     if not hotel_db:
         raise HTTPException(status_code=404, detail="Hotel not found")
-    db.delete(hotel_db)
-    db.commit()
+    await db.delete(hotel_db)
+    await db.commit()
+    availability_index.remove_hotel(hotel_id)
+    autocomplete_index.remove('hotel', hotel_id)
     return {"message": f"Hotel {hotel_id} deleted successfully"}
@@ -1,61 +1,90 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 from app.db.models import Review
-from app.db.schemas import ReviewOutSchema, ReviewCreateSchema, ReviewUpdateSchema
-from app.db.database import SessionLocal
+from app.db.schemas import Page, ReviewOutSchema, ReviewCreateSchema, ReviewUpdateSchema
+from app.db.database import get_db
+from app.db.response_cache import CachedRoute
+from app.db.pagination import PageParams, paginate
+from app.db.fields import FieldsParam, SparseFields
+from app.db.conditional import conditional_row
+from app.db.export import ExportFormat, export_response
+from app.db.rating import rating_changes
+from app.db.coalesce import coalesce_requests
 
-review_router = APIRouter(prefix="/review", tags=["Review"])
-
-
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+review_router = APIRouter(prefix="/review", tags=["Review"], route_class=CachedRoute)
 
 
 @review_router.post("/", response_model=ReviewOutSchema)
-async def create_review(review_data: ReviewCreateSchema, db: Session = Depends(get_db)):
+async def create_review(review_data: ReviewCreateSchema, db: AsyncSession = Depends(get_db)):
     new_review = Review(**review_data.dict())
 
     db.add(new_review)
-    db.commit()
-    db.refresh(new_review)
+    # рейтинг отеля меняется в той же транзакции, что и отзыв
+    for statement in rating_changes(new_review.hotel_id, None, new_review.stars):
+        await db.execute(statement)
+    await db.commit()
+    await db.refresh(new_review)
     return new_review
 
 
-@review_router.get("/", response_model=List[ReviewOutSchema])
-async def list_reviews(db: Session = Depends(get_db)):
-    return db.query(Review).all()
+@review_router.get("/", response_model=Page[ReviewOutSchema])
+@coalesce_requests
+async def list_reviews(page: PageParams = Depends(), fields: FieldsParam = Depends(),
+                       db: AsyncSession = Depends(get_db)):
+    sparse = SparseFields(Review, ReviewOutSchema, fields)
+    return sparse.page(await paginate(db, select(Review).options(*sparse.options), page, Review.id))
+
+
+@review_router.get("/export/")
+async def export_reviews(export_format: ExportFormat = Query(ExportFormat.csv, alias="format"),
+                         hotel_id: Optional[int] = None,
+                         user_id: Optional[int] = None,
+                         db: AsyncSession = Depends(get_db)):
+    query = select(*Review.__table__.columns).order_by(Review.id)
+    if hotel_id is not None:
+        query = query.where(Review.hotel_id == hotel_id)
+    if user_id is not None:
+        query = query.where(Review.user_id == user_id)
+    return export_response(db, query, export_format, "reviews")
 
 
 @review_router.get("/{review_id}/", response_model=ReviewOutSchema)
-async def detail_review(review_id: int, db: Session = Depends(get_db)):
-    review_db = db.query(Review).filter(Review.id == review_id).first()
+@coalesce_requests
+async def detail_review(review_id: int, request: Request, fields: FieldsParam = Depends(),
+                        db: AsyncSession = Depends(get_db)):
+    sparse = SparseFields(Review, ReviewOutSchema, fields, always=[Review.updated_at])
+    review_db = await db.get(Review, review_id, options=sparse.options)
     if not review_db:
         raise HTTPException(status_code=404, detail="Review not found")
-    return review_db
+    return conditional_row(request, review_db) or sparse.one(review_db)
 
 
 @review_router.put("/{review_id}/", response_model=ReviewOutSchema)
-async def update_review(review_data: ReviewUpdateSchema, review_id: int, db: Session = Depends(get_db)):
-    review_db = db.query(Review).filter(Review.id == review_id).first()
+async def update_review(review_data: ReviewUpdateSchema, review_id: int, db: AsyncSession = Depends(get_db)):
+    # блокируем отзыв до commit: иначе две одновременные правки прочитают одни и те же
+    # старые звёзды и обе применят дельту к агрегатам отеля
+    review_db = await db.scalar(select(Review).where(Review.id == review_id).with_for_update())
     if not review_db:
         raise HTTPException(status_code=404, detail="Review not found")
+    for statement in rating_changes(review_db.hotel_id, review_db.stars, review_data.stars):
+        await db.execute(statement)
     review_db.stars = review_data.stars
     review_db.comment = review_data.comment
-    db.commit()
-    db.refresh(review_db)
+    await db.commit()
+    await db.refresh(review_db)
     return review_db
 
 
 @review_router.delete("/{review_id}/")
-async def delete_review(review_id: int, db: Session = Depends(get_db)):
-    review_db = db.query(Review).filter(Review.id == review_id).first()
+async def delete_review(review_id: int, db: AsyncSession = Depends(get_db)):
+    # та же блокировка: два одновременных удаления не должны дважды вычесть оценку
+    review_db = await db.scalar(select(Review).where(Review.id == review_id).with_for_update())
     if not review_db:
         raise HTTPException(status_code=404, detail="Review not found")
-    db.delete(review_db)
-    db.commit()
+    for statement in rating_changes(review_db.hotel_id, review_db.stars, None):
+        await db.execute(statement)
+    await db.delete(review_db)
+    await db.commit()
     return {"message": f"Review {review_id} deleted successfully"}
@@ -1,48 +1,108 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from app.db.models import Room
-from app.db.schemas import (RoomOutSchema, RoomDetailSchema,
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import date
+from app.db.models import Room, RoomType, RoomStatus
+from app.db.availability import available_rooms_query
+from app.db.availability_index import availability_index
+from app.db.schemas import (Page, RoomOutSchema, RoomDetailSchema,
                             RoomCreateSchema, RoomUpdateSchema)
-from app.db.database import SessionLocal
+from app.db.database import get_db
+from app.db.response_cache import CachedRoute, cache_response, invalidate_cache
+from app.db.pagination import PageParams, paginate, paginate_candidates, sort_param
+from app.db.fields import FieldsParam, SparseFields
+from app.db.conditional import conditional_row
+from app.db.coalesce import coalesce_requests
 
-room_router = APIRouter(prefix="/room", tags=["Room"])
+room_router = APIRouter(prefix="/room", tags=["Room"], route_class=CachedRoute)
 
-
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# разрешённые ключи ?sort= (с "-" - по убыванию), под каждый есть индекс (..., id)
+ROOM_SORTS = {'id': None, 'price': Room.price, 'max_guests': Room.max_guests}
 
 
 @room_router.post("/", response_model=RoomOutSchema)
-async def create_room(room_data: RoomCreateSchema, db: Session = Depends(get_db)):
+async def create_room(room_data: RoomCreateSchema, db: AsyncSession = Depends(get_db)):
     new_room = Room(**room_data.dict())
 
     db.add(new_room)
-    db.commit()
-    db.refresh(new_room)
+    await db.commit()
+    await db.refresh(new_room)
+    availability_index.set_room(new_room.id, new_room.hotel_id, new_room.max_guests, new_room.room_type)
     return new_room
 
 
-@room_router.get("/", response_model=List[RoomOutSchema])
-async def list_room(db: Session = Depends(get_db)):
-    return db.query(Room).all()
+@room_router.get("/", response_model=Page[RoomOutSchema])
+@coalesce_requests
+async def list_room(hotel_id: Optional[int] = None,
+                    room_type: Optional[RoomType] = None,
+                    room_status: Optional[RoomStatus] = None,
+                    price_min: Optional[float] = Query(None, ge=0),
+                    price_max: Optional[float] = Query(None, ge=0),
+                    guests: Optional[int] = Query(None, gt=0),
+                    sort: str = 'id',
+                    page: PageParams = Depends(), fields: FieldsParam = Depends(),
+                    db: AsyncSession = Depends(get_db)):
+    sort_column, descending = sort_param(sort, ROOM_SORTS)
+    sparse = SparseFields(Room, RoomOutSchema, fields, always=[sort_column])
+
+    query = select(Room).options(*sparse.options)
+    if hotel_id is not None:
+        query = query.where(Room.hotel_id == hotel_id)
+    if room_type is not None:
+        query = query.where(Room.room_type == room_type)
+    if room_status is not None:
+        query = query.where(Room.room_status == room_status)
+    if price_min is not None:
+        query = query.where(Room.price >= price_min)
+    if price_max is not None:
+        query = query.where(Room.price <= price_max)
+    if guests is not None:
+        query = query.where(Room.max_guests >= guests)
+    return sparse.page(await paginate(db, query, page, Room.id, sort_column, descending))
+
+
+@room_router.get("/available/", response_model=Page[RoomOutSchema])
+@coalesce_requests
+async def list_available_room(check_in: date, check_out: date,
+                              hotel_id: Optional[int] = None,
+                              guests: Optional[int] = Query(None, gt=0),
+                              room_type: Optional[RoomType] = None,
+                              city_id: Optional[int] = None,
+                              page: PageParams = Depends(),
+                              fields: FieldsParam = Depends(),
+                              db: AsyncSession = Depends(get_db)):
+    if check_out <= check_in:
+        raise HTTPException(status_code=400, detail="check_out must be after check_in")
+    sparse = SparseFields(Room, RoomOutSchema, fields)
+
+    query = available_rooms_query(check_in, check_out, hotel_id, guests, room_type, city_id)
+    if availability_index.covers(check_in, check_out):
+        # индекс воркера только сужает кандидатов: брони других воркеров он увидит лишь после
+        # перестройки, поэтому каждого кандидата перепроверяет точный NOT EXISTS запрос
+        room_ids = availability_index.free_rooms(check_in, check_out, hotel_id=hotel_id, city_id=city_id,
+                                                 guests=guests, room_type=room_type)
+        return sparse.page(await paginate_candidates(db, query.options(*sparse.options), Room.id, room_ids, page))
+
+    return sparse.page(await paginate(db, query.options(*sparse.options), page, Room.id))
 
 
 @room_router.get("/{room_id}/", response_model=RoomDetailSchema)
-async def detail_room(room_id: int, db: Session = Depends(get_db)):
-    room = db.query(Room).filter(Room.id == room_id).first()
+@cache_response('room:{room_id}')
+@coalesce_requests
+async def detail_room(room_id: int, request: Request, fields: FieldsParam = Depends(),
+                      db: AsyncSession = Depends(get_db)):
+    sparse = SparseFields(Room, RoomDetailSchema, fields, always=[Room.updated_at])
+    room = await db.get(Room, room_id, options=sparse.options)
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
-    return room
+    return conditional_row(request, room) or sparse.one(room)
 
 
 @room_router.put("/{room_id}/", response_model=RoomOutSchema)
-async def update_room(room_data: RoomUpdateSchema, room_id: int, db: Session = Depends(get_db)):
-    room = db.query(Room).filter(Room.id == room_id).first()
+@invalidate_cache('room:{room_id}')
+async def update_room(room_data: RoomUpdateSchema, room_id: int, db: AsyncSession = Depends(get_db)):
+    room = await db.get(Room, room_id)
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
 
@@ -54,17 +114,20 @@ async def update_room(room_data: RoomUpdateSchema, room_id: int, db: Session = D
     room.max_guests = room_data.max_guests
     room.hotel_id = room_data.hotel_id
 
-    db.commit()
-    db.refresh(room)
+    await db.commit()
+    await db.refresh(room)
+    availability_index.set_room(room.id, room.hotel_id, room.max_guests, room.room_type)
     return room
 
 
 @room_router.delete("/{room_id}/")
-async def delete_room(room_id: int, db: Session = Depends(get_db)):
-    room = db.query(Room).filter(Room.id == room_id).first()
+@invalidate_cache('room:{room_id}')
+async def delete_room(room_id: int, db: AsyncSession = Depends(get_db)):
+    room = await db.get(Room, room_id)
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
 
-    db.delete(room)
-    db.commit()
+    await db.delete(room)
+    await db.commit()
+    availability_index.remove_room(room_id)
     return {"message": f"Room {room_id} deleted successfully"}
\ No newline at end of file
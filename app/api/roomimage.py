@@ -1,41 +1,34 @@
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models import RoomImage
-from app.db.schemas import (RoomImageOutSchema, RoomImageCreateSchema,
+from app.db.schemas import (Page, RoomImageOutSchema, RoomImageCreateSchema,
                             RoomImageUpdateSchema, RoomImageDetailSchema)
-from app.db.database import SessionLocal
+from app.db.database import get_db, SessionRoute
+from app.db.pagination import PageParams, paginate
 
-room_image_router = APIRouter(prefix="/room-image", tags=["RoomImage"])
-
-
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+room_image_router = APIRouter(prefix="/room-image", tags=["RoomImage"], route_class=SessionRoute)
 
 
 @room_image_router.post("/", response_model=RoomImageOutSchema)
 async def create_room_image(room_image_data: RoomImageCreateSchema,
-                            db: Session = Depends(get_db)):
+                            db: AsyncSession = Depends(get_db)):
     new_room_image = RoomImage(room_image=room_image_data.room_image,
                                room_id=room_image_data.room_id)
     db.add(new_room_image)
-    db.commit()
-    db.refresh(new_room_image)
+    await db.commit()
+    await db.refresh(new_room_image)
     return new_room_image
 
 
-@room_image_router.get("/", response_model=List[RoomImageOutSchema])
-async def list_room_images(db: Session = Depends(get_db)):
-    return db.query(RoomImage).all()
+@room_image_router.get("/", response_model=Page[RoomImageOutSchema])
+async def list_room_images(page: PageParams = Depends(), db: AsyncSession = Depends(get_db)):
+    return await paginate(db, select(RoomImage), page, RoomImage.id)
 
 
 @room_image_router.get("/{room_image_id}/", response_model=RoomImageDetailSchema)
-async def detail_room_image(room_image_id: int, db: Session = Depends(get_db)):
-    room_image_db = db.query(RoomImage).filter(RoomImage.id == room_image_id).first()
+async def detail_room_image(room_image_id: int, db: AsyncSession = Depends(get_db)):
+    room_image_db = await db.get(RoomImage, room_image_id)
     if not room_image_db:
         raise HTTPException(status_code=404, detail="Room Image not found")
     return room_image_db
@@ -43,22 +36,22 @@ async def detail_room_image(room_image_id: int, db: Session = Depends(get_db)):
 
 @room_image_router.put("/{room_image_id}/", response_model=RoomImageOutSchema)
 async def update_room_image(room_image_data: RoomImageUpdateSchema, room_image_id: int,
-                            db: Session = Depends(get_db)):
-    room_image_db = db.query(RoomImage).filter(RoomImage.id == room_image_id).first()
+                            db: AsyncSession = Depends(get_db)):
+    room_image_db = await db.get(RoomImage, room_image_id)
     if not room_image_db:
         raise HTTPException(status_code=404, detail="Room Image not found")
     room_image_db.room_image = room_image_data.room_image
     room_image_db.room_id = room_image_data.room_id
-    db.commit()
-    db.refresh(room_image_db)
+    await db.commit()
+    await db.refresh(room_image_db)
     return room_image_db
 
 
 @room_image_router.delete("/{room_image_id}/")
-async def delete_room_image(room_image_id: int, db: Session = Depends(get_db)):
-    room_image_db = db.query(RoomImage).filter(RoomImage.id == room_image_id).first()
+async def delete_room_image(room_image_id: int, db: AsyncSession = Depends(get_db)):
+    room_image_db = await db.get(RoomImage, room_image_id)
     if not room_image_db:
         raise HTTPException(status_code=404, detail="Room Image not found")
-    db.delete(room_image_db)
-    db.commit()
+    await db.delete(room_image_db)
+    await db.commit()
     return {"message": f"Room Image {room_image_id} deleted successfully"}
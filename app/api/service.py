@@ -1,53 +1,58 @@
-from fastapi import HTTPException, Depends, APIRouter
+from fastapi import HTTPException, Depends, APIRouter, Request
 from app.db.models import Service
-from app.db.schemas import ServiceSchema
-from app.db.database import SessionLocal
-from sqlalchemy.orm import Session
-from typing import List
+from app.db.schemas import Page, ServiceSchema
+from app.db.database import get_db, SessionLocal
+from app.db.reference_cache import reference_cache
+from app.db.response_cache import CachedRoute, cache_response, invalidate_cache
+from app.db.pagination import PageParams, paginate
+from app.db.conditional import conditional_collection, conditional_row
+from app.db.coalesce import coalesce_requests
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-service_router = APIRouter(prefix='/service', tags=['Service'])
+service_router = APIRouter(prefix='/service', tags=['Service'], route_class=CachedRoute)
 
 
 
 @service_router.post('/', response_model=ServiceSchema)
-async def create_service(service_data: ServiceSchema, db: Session = Depends(get_db)):
+@invalidate_cache('service')
+async def create_service(service_data: ServiceSchema, db: AsyncSession = Depends(get_db)):
     new_service = Service(
         service_name=service_data.service_name,
         service_image=service_data.service_image
     )
 
     db.add(new_service)
-    db.commit()
-    db.refresh(new_service)
+    await db.commit()
+    await db.refresh(new_service)
+    await reference_cache.changed(SessionLocal, 'service')
     return new_service
 
 
-@service_router.get('/', response_model=List[ServiceSchema])
-async def list_services(db: Session = Depends(get_db)):
-    return db.query(Service).all()
+@service_router.get('/', response_model=Page[ServiceSchema])
+@cache_response('service')
+@coalesce_requests
+async def list_services(request: Request, page: PageParams = Depends(), db: AsyncSession = Depends(get_db)):
+    not_modified = await conditional_collection(request, db, Service)
+    if not_modified:
+        return not_modified
+    return await paginate(db, select(Service), page, Service.id)
 
 
 @service_router.get('/{service_id}/', response_model=ServiceSchema)
-async def detail_service(service_id: int, db: Session = Depends(get_db)):
-    service_db = db.query(Service).filter(Service.id == service_id).first()
+async def detail_service(service_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    service_db = reference_cache.service(service_id) or await db.get(Service, service_id)
 
     if service_db is None:
         raise HTTPException(status_code=404, detail='Service not found')
-    return service_db
+    return conditional_row(request, service_db) or service_db
 
 
 @service_router.put('/{service_id}/', response_model=ServiceSchema)
-async def update_service(service_data: ServiceSchema, service_id: int, db: Session = Depends(get_db)):
-    service_db = db.query(Service).filter(Service.id == service_id).first()
+@invalidate_cache('service')
+async def update_service(service_data: ServiceSchema, service_id: int, db: AsyncSession = Depends(get_db)):
+    service_db = await db.get(Service, service_id)
 
     if service_db is None:
         raise HTTPException(status_code=404, detail='Service not found')
@@ -55,19 +60,22 @@ async def update_service(service_data: ServiceSchema, service_id: int, db: Sessi
     service_db.service_name = service_data.service_name
     service_db.service_image = service_data.service_image
 
-    db.commit()
-    db.refresh(service_db)
+    await db.commit()
+    await db.refresh(service_db)
+    await reference_cache.changed(SessionLocal, 'service')
     return service_db
 
 
 @service_router.delete('/{service_id}/')
-async def delete_service(service_id: int, db: Session = Depends(get_db)):
-    service_db = db.query(Service).filter(Service.id == service_id).first()
+@invalidate_cache('service')
+async def delete_service(service_id: int, db: AsyncSession = Depends(get_db)):
+    service_db = await db.get(Service, service_id)
 
     if service_db is None:
         raise HTTPException(status_code=404, detail='Service not found')
 
-    db.delete(service_db)
-    db.commit()
+    await db.delete(service_db)
+    await db.commit()
+    await reference_cache.changed(SessionLocal, 'service')
     return {'message': f'Service {service_id} deleted successfully'}
 
@@ -1,6 +1,4 @@
-from sqlalchemy.orm import Session
-from app.db.database import SessionLocal
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter
 from starlette.requests import Request
 from app.config import settings
 from authlib.integrations.starlette_client import OAuth
@@ -26,15 +24,6 @@ oauth.register(
 social_router = APIRouter(prefix='/oauth', tags=['Oauth'])
 
 
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-
 @social_router.get('/github')
 async def github_login(request: Request):
     redirect_url = settings.GITHUB_LOGIN_CALLBACK
@@ -1,39 +1,33 @@
 from fastapi import HTTPException, Depends, APIRouter
 from app.db.models import UserProfile
-from app.db.schemas import UserProfileSchema, UserProfileUpdateSchema
-from app.db.database import SessionLocal
-from sqlalchemy.orm import Session
-from typing import List
+from app.db.schemas import Page, UserProfileSchema, UserProfileUpdateSchema
+from app.db.database import get_db, SessionRoute
+from app.db.pagination import PageParams, paginate
+from app.db.user_cache import user_cache
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+user_router = APIRouter(prefix='/user', tags=['UserProfile'], route_class=SessionRoute)
 
 
-user_router = APIRouter(prefix='/user', tags=['UserProfile'])
+@user_router.get('/me/', response_model=Page[UserProfileSchema])
+async def list_user(page: PageParams = Depends(), db: AsyncSession = Depends(get_db)):
 
-
-@user_router.get('/me/', response_model=List[UserProfileSchema])
-async def list_user(db: Session = Depends(get_db)):
-
-    return db.query(UserProfile).all()
+    return await paginate(db, select(UserProfile), page, UserProfile.id)
 
 
 @user_router.get('/me/{user_id}/', response_model=UserProfileSchema)
-async def detail_user(user_id: int, db: Session = Depends(get_db)):
-    user_db = db.query(UserProfile).filter(UserProfile.id == user_id).first()
+async def detail_user(user_id: int, db: AsyncSession = Depends(get_db)):
+    user_db = await db.get(UserProfile, user_id)
     if user_db is None:
         raise HTTPException(status_code=404, detail='User not found')
     return user_db
 
 
 @user_router.put('/{user_id}/', response_model=UserProfileSchema)
-async def update_user(user_data: UserProfileUpdateSchema, user_id: int, db: Session=Depends(get_db)):
-    user_db = db.query(UserProfile).filter(UserProfile.id == user_id).first()
+async def update_user(user_data: UserProfileUpdateSchema, user_id: int, db: AsyncSession=Depends(get_db)):
+    user_db = await db.get(UserProfile, user_id)
 
     if user_db is None:
         raise HTTPException(status_code=404, detail='User not found')
@@ -42,17 +36,19 @@ async def update_user(user_data: UserProfileUpdateSchema, user_id: int, db: Sess
         setattr(user_db, user_key, user_value)
 
     db.add(user_db)
-    db.commit()
-    db.refresh(user_db)
+    await db.commit()
+    await db.refresh(user_db)
+    user_cache.invalidate(user_id)
     return user_db
 
 
 @user_router.delete('/me/{user_id}/')
-async def delete_user(user_id: int, db: Session=Depends(get_db)):
-    user_db = db.query(UserProfile).filter(UserProfile.id == user_id).first()
+async def delete_user(user_id: int, db: AsyncSession=Depends(get_db)):
+    user_db = await db.get(UserProfile, user_id)
 
     if user_db is None:
         raise HTTPException(status_code=404, detail='User not found')
-    db.delete(user_db)
-    db.commit()
+    await db.delete(user_db)
+    await db.commit()
+    user_cache.invalidate(user_id)
     return {'message': f'User {user_id} deleted successfully'}
\ No newline at end of file
@@ -10,6 +10,64 @@ REFRESH_TOKEN_LIFETIME = 3
 ENCRYPT_KEY = os.getenv('ENCRYPT_KEY')
 
 
+# пул соединений к базе
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 20))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))  # сек ожидания свободного соединения
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))  # сек, -1 чтобы отключить
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', 0))  # мс, 0 - без ограничения (только postgres)
+
+# логирование медленных запросов и подозрений на N+1
+DB_SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', 200))
+DB_N_PLUS_ONE_THRESHOLD = int(os.getenv('DB_N_PLUS_ONE_THRESHOLD', 5))  # один запрос с N разными параметрами
+
+# индекс свободных комнат в памяти (app/db/availability_index.py)
+AVAILABILITY_HORIZON_DAYS = int(os.getenv('AVAILABILITY_HORIZON_DAYS', 365))
+AVAILABILITY_REFRESH_SECONDS = int(os.getenv('AVAILABILITY_REFRESH_SECONDS', 300))
+
+# автодополнение названий городов/стран/отелей в памяти (app/db/autocomplete_index.py)
+AUTOCOMPLETE_REFRESH_SECONDS = int(os.getenv('AUTOCOMPLETE_REFRESH_SECONDS', 300))
+
+# keyset пагинация list эндпоинтов
+PAGE_DEFAULT_LIMIT = int(os.getenv('PAGE_DEFAULT_LIMIT', 50))
+PAGE_MAX_LIMIT = int(os.getenv('PAGE_MAX_LIMIT', 200))
+
+# выгрузка броней/отзывов (app/db/export.py): строк за одну выборку из серверного курсора
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+
+# поиск отелей рядом (app/db/geo.py)
+NEARBY_DEFAULT_RADIUS_KM = float(os.getenv('NEARBY_DEFAULT_RADIUS_KM', 5))
+NEARBY_MAX_RADIUS_KM = float(os.getenv('NEARBY_MAX_RADIUS_KM', 100))
+
+# сколько последних отзывов отдаёт GET /hotel/{id}/full/
+HOTEL_LATEST_REVIEWS = int(os.getenv('HOTEL_LATEST_REVIEWS', 5))
+
+# кэш ответов GET (app/db/response_cache.py): redis, если задан CACHE_REDIS_URL, иначе память процесса
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL')
+CACHE_TTL_SECONDS = int(os.getenv('CACHE_TTL_SECONDS', 60))
+CACHE_MEMORY_MAX_ENTRIES = int(os.getenv('CACHE_MEMORY_MAX_ENTRIES', 10000))
+CACHE_PREFIX = os.getenv('CACHE_PREFIX', 'booking')
+
+# хеширование паролей (app/passwords.py): bcrypt в отдельном пуле потоков, не в event loop
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv('PASSWORD_BCRYPT_ROUNDS', 12))  # при смене хеши пересчитываются при входе
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', 64))  # сверх этого сразу 503
+
+# проверка access токенов (get_current_user): кэш разобранных токенов и профилей пользователей в памяти воркера
+AUTH_CACHE_TTL_SECONDS = int(os.getenv('AUTH_CACHE_TTL_SECONDS', 60))  # столько другой воркер может видеть старый профиль
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 10000))
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', 10000))
+
+# чистка просроченных refresh токенов (app/db/refresh_tokens.py)
+REFRESH_TOKEN_PURGE_SECONDS = int(os.getenv('REFRESH_TOKEN_PURGE_SECONDS', 3600))
+REFRESH_TOKEN_PURGE_BATCH = int(os.getenv('REFRESH_TOKEN_PURGE_BATCH', 1000))  # строк за одну транзакцию
+
+# реплика для чтения, если не задана - GET запросы идут в основную базу
+REPLICA_DATABASE_URL = os.getenv('REPLICA_DATABASE_URL')
+REPLICA_READ_YOUR_WRITES = float(os.getenv('REPLICA_READ_YOUR_WRITES', 5))  # сек после своей записи читаем из primary
+
+
 class Settings:
     GITHUB_CLIENT_ID = os.getenv('GITHUB_CLIENT_ID')
     GITHUB_KEY = os.getenv('GITHUB_KEY')
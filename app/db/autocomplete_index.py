@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import re
+from bisect import bisect_left
+from sqlalchemy import select
+from app.config import AUTOCOMPLETE_REFRESH_SECONDS
+from app.db.models import City, Country, Hotel
+
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('country', 'city', 'hotel')
+WORD_START = re.compile(r'(?<![\w])\w', re.UNICODE)
+
+
+def normalize(text: str) -> str:
+    return ' '.join(text.casefold().replace('ё', 'е').split())
+
+
+class AutocompleteIndex:
+    """Префиксный поиск по названиям в памяти процесса.
+
+    Отсортированные списки ключей + bisect: для названия "Issyk-Kul Sea Resort"
+    лежат ключи "issyk-kul sea resort", "kul sea resort", "sea resort", "resort",
+    так что находится и начало названия, и начало любого слова в нём.
+    Добавление/удаление - insort/удаление по позиции, перестройка не нужна.
+
+    Списков шесть - по группам ранжирования: (начало названия / начало слова) x (страна, город, отель).
+    Поиск идёт по группам в порядке важности, поэтому ограничение просмотра
+    в одной группе не вытесняет из выдачи более важные группы.
+
+    Как и индекс свободных комнат, каждый воркер держит свой экземпляр:
+    свои изменения применяет сразу, чужие - при периодической перестройке.
+    """
+
+    # порядок выдачи: совпадение с начала названия важнее совпадения с начала слова,
+    # дальше страна > город > отель
+    GROUPS = [(name_start, kind) for name_start in (True, False) for kind in KINDS]
+
+    def __init__(self):
+        self._reset()
+        self.ready = False
+
+    def _reset(self):
+        # группа -> (отсортированные ключи, id параллельно ключам)
+        self._groups = {group: ([], []) for group in self.GROUPS}
+        self._names = {}    # (kind, id) -> название
+
+    @staticmethod
+    def _suffixes(name: str):
+        name = normalize(name)
+        starts = [match.start() for match in WORD_START.finditer(name)]
+        return [(name[start:], position == 0) for position, start in enumerate(starts)]
+
+    def _insert(self, kind: str, item_id: int, name: str):
+        for key, name_start in self._suffixes(name):
+            keys, ids = self._groups[(name_start, kind)]
+            index = bisect_left(keys, key)
+            keys.insert(index, key)
+            ids.insert(index, item_id)
+
+    def load(self, items):
+        """items: (kind, id, name)."""
+        pairs = {group: [] for group in self.GROUPS}
+        names = {}
+        for kind, item_id, name in items:
+            if not name:
+                continue
+            names[(kind, item_id)] = name
+            for key, name_start in self._suffixes(name):
+                pairs[(name_start, kind)].append((key, item_id))
+        groups = {}
+        for group, group_pairs in pairs.items():
+            group_pairs.sort()
+            groups[group] = ([key for key, _ in group_pairs], [item_id for _, item_id in group_pairs])
+        self._groups = groups
+        self._names = names
+        self.ready = True
+
+    def set(self, kind: str, item_id: int, name: str):
+        self.remove(kind, item_id)
+        if name:
+            self._names[(kind, item_id)] = name
+            self._insert(kind, item_id, name)
+
+    def remove(self, kind: str, item_id: int):
+        name = self._names.pop((kind, item_id), None)
+        if name is None:
+            return
+        for key, name_start in self._suffixes(name):
+            keys, ids = self._groups[(name_start, kind)]
+            index = bisect_left(keys, key)
+            while index < len(keys) and keys[index] == key:
+                if ids[index] == item_id:
+                    del keys[index]
+                    del ids[index]
+                    break
+                index += 1
+
+    def search(self, q: str, limit: int = 10, kind=None) -> list:
+        prefix = normalize(q)
+        if not prefix:
+            return []
+        results = []
+        seen = set()
+        for name_start, group_kind in self.GROUPS:
+            if len(results) >= limit:
+                break
+            if kind is not None and group_kind != kind:
+                continue
+            keys, ids = self._groups[(name_start, group_kind)]
+            index = bisect_left(keys, prefix)
+            # в группе смотрим не больше limit * 10 ключей - короткий префикс не должен обходить весь индекс;
+            # внутри группы короткие названия выше
+            end = min(len(keys), index + limit * 10)
+            found = []
+            while index < end and keys[index].startswith(prefix):
+                item = (group_kind, ids[index])
+                if item not in seen:
+                    seen.add(item)
+                    found.append(item)
+                index += 1
+            found.sort(key=lambda item: (len(self._names[item]), self._names[item]))
+            results.extend(found[:limit - len(results)])
+        return [{'kind': entry_kind, 'id': item_id, 'name': self._names[(entry_kind, item_id)]}
+                for entry_kind, item_id in results]
+
+
+autocomplete_index = AutocompleteIndex()
+
+
+async def build_autocomplete_index(session_factory, index: AutocompleteIndex = autocomplete_index):
+    async with session_factory() as db:
+        countries = (await db.execute(select(Country.id, Country.country_name))).all()
+        cities = (await db.execute(select(City.id, City.city_name))).all()
+        hotels = (await db.execute(select(Hotel.id, Hotel.hotel_name))).all()
+    index.load([('country', item_id, name) for item_id, name in countries]
+               + [('city', item_id, name) for item_id, name in cities]
+               + [('hotel', item_id, name) for item_id, name in hotels])
+    logger.info('autocomplete index: %d countries, %d cities, %d hotels',
+                len(countries), len(cities), len(hotels))
+
+
+async def refresh_autocomplete_index(session_factory, index: AutocompleteIndex = autocomplete_index):
+    # подтягиваем названия, изменённые другими воркерами
+    while True:
+        await asyncio.sleep(AUTOCOMPLETE_REFRESH_SECONDS)
+        try:
+            await build_autocomplete_index(session_factory, index)
+        except Exception:
+            logger.exception('autocomplete index refresh failed')
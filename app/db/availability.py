@@ -0,0 +1,102 @@
+from datetime import date
+from typing import Optional
+from sqlalchemy import select, exists, and_, insert, update, cast, literal
+from sqlalchemy.orm import aliased
+from app.db.models import Room, Booking, Hotel, BookingStatus, RoomType
+from app.db.database import engine
+
+
+def booking_overlaps(check_in: date, check_out: date, booking=Booking):
+    # [check_in, check_out) пересекается с бронью, если она началась до нашего выезда
+    # и закончилась после нашего заезда. Отменённые брони комнату не занимают.
+    # Покрывается индексом ix_booking_room_id_check_in_check_out
+    return and_(
+        booking.booking_status != BookingStatus.cancelled,
+        booking.check_in < check_out,
+        booking.check_out > check_in,
+    )
+
+
+def room_is_free(check_in: date, check_out: date):
+    return ~exists().where(Booking.room_id == Room.id, booking_overlaps(check_in, check_out))
+
+
+def available_rooms_query(check_in: date, check_out: date,
+                          hotel_id: Optional[int] = None, guests: Optional[int] = None,
+                          room_type: Optional[RoomType] = None, city_id: Optional[int] = None):
+    query = select(Room).where(room_is_free(check_in, check_out))
+    if hotel_id is not None:
+        query = query.where(Room.hotel_id == hotel_id)
+    if guests is not None:
+        query = query.where(Room.max_guests >= guests)
+    if room_type is not None:
+        query = query.where(Room.room_type == room_type)
+    if city_id is not None:
+        query = query.join(Hotel, Room.hotel_id == Hotel.id).where(Hotel.city_id == city_id)
+    return query.order_by(Room.id)
+
+
+def available_hotels_query(check_in: date, check_out: date, guests: Optional[int] = None,
+                           city_id: Optional[int] = None, country_id: Optional[int] = None):
+    free_room = select(Room.id).where(Room.hotel_id == Hotel.id, room_is_free(check_in, check_out))
+    if guests is not None:
+        free_room = free_room.where(Room.max_guests >= guests)
+
+    query = select(Hotel).where(free_room.exists())
+    if city_id is not None:
+        query = query.where(Hotel.city_id == city_id)
+    if country_id is not None:
+        query = query.where(Hotel.country_id == country_id)
+    return query.order_by(Hotel.id)
+
+
+def conflicting_booking_query(room_id: int, check_in: date, check_out: date,
+                              exclude_id: Optional[int] = None):
+    query = select(Booking).where(Booking.room_id == room_id, booking_overlaps(check_in, check_out))
+    if exclude_id is not None:
+        query = query.where(Booking.id != exclude_id)
+    return query.order_by(Booking.check_in).limit(1)
+
+
+def bookings_for_rooms_query(room_ids, check_in: date, check_out: date):
+    # одним запросом все активные брони нужных комнат в общем окне дат,
+    # точное пересечение с каждой позицией проверяется уже в python
+    return select(Booking).where(Booking.room_id.in_(room_ids),
+                                 booking_overlaps(check_in, check_out))
+
+
+def insert_booking_if_free(values: dict):
+    # INSERT ... SELECT ... WHERE NOT EXISTS: проверка и вставка одной командой,
+    # в sqlite этого достаточно (запись в базу всегда одна). В postgres две такие
+    # вставки могут пройти параллельно - их разводит exclusion constraint booking_room_id_dates_excl
+    columns = list(values)
+    # в postgres нужен явный CAST, иначе asyncpg выводит тип параметров в SELECT как text;
+    # в sqlite CAST(... AS DATE) наоборот превращает дату в число
+    wrap = cast if engine.dialect.name == 'postgresql' else literal
+    source = select(*[wrap(values[column], Booking.__table__.c[column].type) for column in columns])
+    if values.get('booking_status') != BookingStatus.cancelled:
+        source = source.where(~exists().where(
+            Booking.room_id == values['room_id'],
+            booking_overlaps(values['check_in'], values['check_out']),
+        ))
+    return insert(Booking).from_select(columns, source).returning(Booking.id)
+
+
+def update_booking_if_free(booking_id: int, room_id: int, values: dict):
+    # то же для изменения: UPDATE ... WHERE NOT EXISTS, проверка и запись одной командой
+    update_query = update(Booking).where(Booking.id == booking_id).values(**values)
+    if values.get('booking_status') != BookingStatus.cancelled:
+        # другая бронь той же комнаты - через alias, иначе подзапрос сошлётся на обновляемую строку
+        other = aliased(Booking)
+        update_query = update_query.where(~exists().where(
+            other.room_id == room_id,
+            other.id != booking_id,
+            booking_overlaps(values['check_in'], values['check_out'], other),
+        ))
+    return update_query.returning(Booking.id)
+
+
+def is_overlap_violation(error) -> bool:
+    # IntegrityError от exclusion constraint (23P01), а не от внешнего ключа или NOT NULL
+    return (getattr(error.orig, 'sqlstate', None) == '23P01'
+            or 'booking_room_id_dates_excl' in str(error.orig))
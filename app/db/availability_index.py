@@ -0,0 +1,215 @@
+import asyncio
+import logging
+from datetime import date, timedelta
+from typing import Optional
+import numpy as np
+from sqlalchemy import select
+from app.config import AVAILABILITY_HORIZON_DAYS, AVAILABILITY_REFRESH_SECONDS
+from app.db.models import Room, Hotel, Booking, BookingStatus, RoomType
+
+
+logger = logging.getLogger(__name__)
+
+ROOM_TYPES = list(RoomType)
+
+
+class AvailabilityIndex:
+    """Занятость комнат по дням, в памяти процесса.
+
+    Строка матрицы occupancy - одна комната, столбец - день горизонта
+    [start, start + horizon_days). В ячейке число активных броней на этот день:
+    счётчик вместо бита, чтобы удаление брони было точным даже если в базе
+    остались старые пересекающиеся брони. Поиск свободных комнат -
+    это срез по дням и векторные маски numpy без обращения к базе.
+
+    Каждый воркер держит свой индекс: свои изменения он применяет сразу,
+    чужие подтягиваются периодической перестройкой (refresh_availability_index).
+    Поэтому индекс - только фильтр кандидатов: занятые другим воркером комнаты
+    отсекает перепроверка в базе, а комнаты, которые освободились или появились
+    в другом воркере, попадут в выдачу до AVAILABILITY_REFRESH_SECONDS позже.
+    """
+
+    def __init__(self, horizon_days: int = AVAILABILITY_HORIZON_DAYS):
+        self.horizon_days = horizon_days
+        self.start: Optional[date] = None
+        self.ready = False
+        self._reset(0)
+
+    def _reset(self, capacity: int):
+        self._rows = {}  # room_id -> номер строки
+        self.room_ids = np.full(capacity, -1, dtype=np.int64)
+        self.hotel_ids = np.full(capacity, -1, dtype=np.int64)
+        self.max_guests = np.zeros(capacity, dtype=np.int32)
+        self.room_types = np.full(capacity, -1, dtype=np.int8)
+        self.occupancy = np.zeros((capacity, self.horizon_days), dtype=np.uint16)
+        self.hotel_city = {}
+        self.hotel_country = {}
+        self._size = 0
+
+    def _grow(self):
+        capacity = max(16, len(self.room_ids) * 2)
+        extra = capacity - len(self.room_ids)
+        self.room_ids = np.concatenate([self.room_ids, np.full(extra, -1, dtype=np.int64)])
+        self.hotel_ids = np.concatenate([self.hotel_ids, np.full(extra, -1, dtype=np.int64)])
+        self.max_guests = np.concatenate([self.max_guests, np.zeros(extra, dtype=np.int32)])
+        self.room_types = np.concatenate([self.room_types, np.full(extra, -1, dtype=np.int8)])
+        self.occupancy = np.concatenate(
+            [self.occupancy, np.zeros((extra, self.horizon_days), dtype=np.uint16)])
+
+    def covers(self, check_in: date, check_out: date) -> bool:
+        return (self.ready and self.start <= check_in
+                and check_out <= self.start + timedelta(days=self.horizon_days))
+
+    def _days(self, check_in: date, check_out: date):
+        # бронь может выходить за горизонт - обрезаем по его краям
+        first = max((check_in - self.start).days, 0)
+        last = min((check_out - self.start).days, self.horizon_days)
+        return first, last
+
+    # ---------- загрузка ----------
+
+    def load(self, start: date, rooms, hotels, bookings):
+        """rooms: (id, hotel_id, max_guests, room_type), hotels: (id, city_id, country_id),
+        bookings: (room_id, check_in, check_out) - только активные брони."""
+        self.start = start
+        self._reset(len(rooms))
+        for room_id, hotel_id, max_guests, room_type in rooms:
+            self.set_room(room_id, hotel_id, max_guests, room_type)
+        for hotel_id, city_id, country_id in hotels:
+            self.set_hotel(hotel_id, city_id, country_id)
+
+        # разностный массив: +1 в день заезда, -1 в день выезда, потом cumsum по дням
+        rows, firsts, lasts = [], [], []
+        for room_id, check_in, check_out in bookings:
+            row = self._rows.get(room_id)
+            if row is None or check_in is None or check_out is None:
+                continue
+            first, last = self._days(check_in, check_out)
+            if first < last:
+                rows.append(row)
+                firsts.append(first)
+                lasts.append(last)
+        rows = np.asarray(rows, dtype=np.intp)
+        delta = np.zeros((len(self.room_ids), self.horizon_days + 1), dtype=np.int32)
+        np.add.at(delta, (rows, np.asarray(firsts, dtype=np.intp)), 1)
+        np.add.at(delta, (rows, np.asarray(lasts, dtype=np.intp)), -1)
+        self.occupancy = np.cumsum(delta, axis=1)[:, :self.horizon_days].astype(np.uint16)
+        self.ready = True
+
+    # ---------- инкрементальные изменения ----------
+
+    def set_room(self, room_id: int, hotel_id: Optional[int], max_guests: int, room_type):
+        row = self._rows.get(room_id)
+        if row is None:
+            if self._size == len(self.room_ids):
+                self._grow()
+            row = self._size
+            self._size += 1
+            self._rows[room_id] = row
+            self.room_ids[row] = room_id
+        self.hotel_ids[row] = hotel_id if hotel_id is not None else -1
+        self.max_guests[row] = max_guests or 0
+        # -1 - тип не задан, такая комната не подходит ни под один фильтр room_type
+        self.room_types[row] = ROOM_TYPES.index(RoomType(room_type)) if room_type else -1
+
+    def remove_room(self, room_id: int):
+        row = self._rows.pop(room_id, None)
+        if row is not None:
+            # строку не сдвигаем, просто выключаем
+            self.room_ids[row] = -1
+            self.occupancy[row] = 0
+
+    def set_hotel(self, hotel_id: int, city_id: Optional[int], country_id: Optional[int]):
+        self.hotel_city[hotel_id] = city_id
+        self.hotel_country[hotel_id] = country_id
+
+    def remove_hotel(self, hotel_id: int):
+        self.hotel_city.pop(hotel_id, None)
+        self.hotel_country.pop(hotel_id, None)
+        self.hotel_ids[self.hotel_ids == hotel_id] = -1
+
+    def _apply_booking(self, room_id, check_in, check_out, booking_status, step: int):
+        if not self.ready or booking_status == BookingStatus.cancelled:
+            return
+        row = self._rows.get(room_id)
+        if row is None or check_in is None or check_out is None:
+            return
+        first, last = self._days(check_in, check_out)
+        if first < last:
+            days = self.occupancy[row, first:last]
+            if step > 0:
+                days += 1
+            else:
+                days -= np.minimum(days, 1)
+
+    def add_booking(self, room_id, check_in, check_out, booking_status):
+        self._apply_booking(room_id, check_in, check_out, booking_status, 1)
+
+    def remove_booking(self, room_id, check_in, check_out, booking_status):
+        self._apply_booking(room_id, check_in, check_out, booking_status, -1)
+
+    # ---------- поиск ----------
+
+    def _hotels_mask(self, city_id: Optional[int], country_id: Optional[int]):
+        hotels = [hotel_id for hotel_id, city in self.hotel_city.items()
+                  if (city_id is None or city == city_id)
+                  and (country_id is None or self.hotel_country[hotel_id] == country_id)]
+        return np.isin(self.hotel_ids[:self._size], hotels)
+
+    def _free_mask(self, check_in: date, check_out: date, hotel_id=None, city_id=None,
+                   country_id=None, guests=None, room_type=None):
+        size = self._size
+        first, last = self._days(check_in, check_out)
+        mask = (self.room_ids[:size] >= 0) & ~self.occupancy[:size, first:last].any(axis=1)
+        if hotel_id is not None:
+            mask &= self.hotel_ids[:size] == hotel_id
+        if city_id is not None or country_id is not None:
+            mask &= self._hotels_mask(city_id, country_id)
+        if guests is not None:
+            mask &= self.max_guests[:size] >= guests
+        if room_type is not None:
+            mask &= self.room_types[:size] == ROOM_TYPES.index(RoomType(room_type))
+        return mask
+
+    def free_rooms(self, check_in: date, check_out: date, **filters) -> list:
+        mask = self._free_mask(check_in, check_out, **filters)
+        return self.room_ids[:self._size][mask].tolist()
+
+    def free_hotels(self, check_in: date, check_out: date, **filters) -> list:
+        mask = self._free_mask(check_in, check_out, **filters)
+        hotels = np.unique(self.hotel_ids[:self._size][mask])
+        return hotels[hotels >= 0].tolist()
+
+
+availability_index = AvailabilityIndex()
+
+
+async def build_availability_index(session_factory, index: AvailabilityIndex = availability_index):
+    start = date.today()
+    end = start + timedelta(days=index.horizon_days)
+    async with session_factory() as db:
+        rooms = (await db.execute(select(Room.id, Room.hotel_id, Room.max_guests, Room.room_type))).all()
+        hotels = (await db.execute(select(Hotel.id, Hotel.city_id, Hotel.country_id))).all()
+        bookings = (await db.execute(
+            select(Booking.room_id, Booking.check_in, Booking.check_out).where(
+                Booking.booking_status != BookingStatus.cancelled,
+                Booking.check_out > start,
+                Booking.check_in < end,
+            )
+        )).all()
+    # между запросами выше и load() могли прийти новые брони этого воркера -
+    # их подберёт следующая перестройка
+    index.load(start, rooms, hotels, bookings)
+    logger.info('availability index: %d rooms, %d bookings, %s + %d days',
+                len(rooms), len(bookings), start, index.horizon_days)
+
+
+async def refresh_availability_index(session_factory, index: AvailabilityIndex = availability_index):
+    # перестраиваем по расписанию: сдвигаем горизонт на сегодня
+    # и подтягиваем брони, сделанные другими воркерами
+    while True:
+        await asyncio.sleep(AVAILABILITY_REFRESH_SECONDS)
+        try:
+            await build_availability_index(session_factory, index)
+        except Exception:
+            logger.exception('availability index refresh failed')
@@ -0,0 +1,74 @@
+import asyncio
+from collections import defaultdict
+from fastapi import Request, Response
+from app.db.database import use_replica
+
+
+# Single-flight: одинаковые GET, пришедшие пока первый ещё выполняется, не идут в базу сами,
+# а ждут его результат. В каждом воркере своя карта ключ -> задача.
+
+class SingleFlight:
+    def __init__(self):
+        self._in_flight = {}
+        # по шаблону пути эндпоинта: [выполнено, присоединилось к чужому запросу]
+        self._counts = defaultdict(lambda: [0, 0])
+
+    async def do(self, key, route: str, fn):
+        """(результат, True если он взят у уже выполнявшегося запроса)."""
+        task = self._in_flight.get(key)
+        if task is not None:
+            self._counts[route][1] += 1
+            # shield - отмена ожидающего (клиент ушёл) не должна отменять общий запрос
+            return await asyncio.shield(task), True
+
+        # отдельная задача, а не корутина первого запроса: если его клиент отключится,
+        # остальные всё равно получат ответ
+        task = asyncio.ensure_future(fn())
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._finished(key, done))
+        self._counts[route][0] += 1
+        return await asyncio.shield(task), False
+
+    def _finished(self, key, task):
+        self._in_flight.pop(key, None)
+        # забираем исключение, даже если все ожидающие уже ушли - иначе asyncio пишет в лог
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        routes = {}
+        for route, (executed, joined) in sorted(self._counts.items()):
+            total = executed + joined
+            routes[route] = {'executed': executed, 'coalesced': joined,
+                             'hit_rate': round(joined / total, 4) if total else 0.0}
+        executed = sum(counts[0] for counts in self._counts.values())
+        joined = sum(counts[1] for counts in self._counts.values())
+        total = executed + joined
+        return {'in_flight': len(self._in_flight), 'executed': executed, 'coalesced': joined,
+                'hit_rate': round(joined / total, 4) if total else 0.0, 'routes': routes}
+
+
+single_flight = SingleFlight()
+
+
+def coalesce_requests(endpoint):
+    """Объединять одновременные одинаковые GET этого эндпоинта (работает в CachedRoute).
+    Только для публичных чтений: ответ не должен зависеть от пользователя."""
+    endpoint.coalesce = True
+    return endpoint
+
+
+def request_key(request: Request) -> tuple:
+    # всё, от чего зависит ответ: путь, параметры, условные заголовки (304) и база, из которой читаем
+    return (request.url.path,
+            tuple(sorted(request.query_params.multi_items())),
+            request.headers.get('if-none-match'),
+            request.headers.get('if-modified-since'),
+            use_replica(request))
+
+
+def copy_response(response: Response) -> Response:
+    # у каждого запроса свой объект ответа - middleware дописывают в него свои заголовки
+    copy = Response(response.body, status_code=response.status_code)
+    copy.raw_headers = list(response.raw_headers)
+    return copy
@@ -0,0 +1,90 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response
+from sqlalchemy import func, select
+
+
+# Условные GET: обработчик считает валидаторы (ETag, Last-Modified) до тяжёлой работы,
+# и если у клиента та же версия - отдаёт 304 без сериализации и тела.
+# Заголовки к обычному ответу добавляет CachedRoute (app/db/response_cache.py).
+
+def make_etag(*parts) -> str:
+    # слабый ETag: одинаковые данные, а не побайтно одинаковое тело (gzip, порядок ключей)
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def http_date(value: datetime) -> str:
+    # updated_at хранится в utc без таймзоны
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == '*':
+        return True
+    # для GET сравнение слабое - W/ не учитываем
+    opaque = etag.removeprefix('W/')
+    return any(candidate.strip().removeprefix('W/') == opaque for candidate in header.split(','))
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        # If-None-Match главнее If-Modified-Since (RFC 9110, 13.2.2)
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # Last-Modified с точностью до секунды
+    return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None) -> dict:
+    # no-cache - клиент может хранить ответ, но перед показом переспрашивает с If-None-Match
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    return headers
+
+
+def conditional_get(request: Request, etag: str, last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """304 если у клиента актуальная версия, иначе None - обработчик продолжает как обычно,
+    а валидаторы попадут в заголовки ответа."""
+    headers = validator_headers(etag, last_modified)
+    request.state.validators = headers
+    if request.method in ('GET', 'HEAD') and is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    return None
+
+
+def row_etag(request: Request, obj) -> str:
+    # ETag действует в пределах URL, поэтому хватает id и версии строки;
+    # разные ?fields= - разные представления одной строки
+    return make_etag(obj.id, obj.updated_at, request.query_params.get('fields'))
+
+
+def conditional_row(request: Request, obj) -> Optional[Response]:
+    return conditional_get(request, row_etag(request, obj), obj.updated_at)
+
+
+async def collection_version(db, model, *criteria):
+    """Версия коллекции одним дешёвым запросом: max(updated_at) ловит вставки и правки, count - удаления."""
+    query = select(func.max(model.updated_at), func.count()).select_from(model)
+    if criteria:
+        query = query.where(*criteria)
+    return (await db.execute(query)).one()
+
+
+async def conditional_collection(request: Request, db, model, *criteria) -> Optional[Response]:
+    last_modified, count = await collection_version(db, model, *criteria)
+    etag = make_etag(model.__name__, last_modified, count, str(request.query_params))
+    return conditional_get(request, etag, last_modified)
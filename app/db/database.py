@@ -1,21 +1,167 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session, sessionmaker
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from dotenv import load_dotenv
+from app.config import (DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+                        DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT,
+                        REPLICA_DATABASE_URL, REPLICA_READ_YOUR_WRITES)
+from app.db.pool import TimedQueuePool
+from app.db.query_stats import install_query_hooks
 import os
+import time
 
 load_dotenv()
 DB_URL = os.getenv('DATABASE_URL')
-engine =create_engine(DB_URL)
 
 
-SessionLocal = sessionmaker(bind=engine)
+# драйверы для async: asyncpg для postgres, aiosqlite для локальной sqlite
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'postgres': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def make_async_url(url: str) -> str:
+    scheme, sep, rest = url.partition('://')
+    if '+' in scheme:
+        # драйвер уже указан явно (postgresql+asyncpg://...)
+        return url
+    return f'{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}'
+
+
+def engine_options(url: str) -> dict:
+    if ':memory:' in url:
+        # in-memory sqlite живёт в одном соединении, пул ему не нужен
+        return {}
+
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+    }
+    if url.startswith('postgresql+asyncpg') and DB_STATEMENT_TIMEOUT:
+        options['connect_args'] = {'server_settings': {'statement_timeout': str(DB_STATEMENT_TIMEOUT)}}
+    return options
+
+
+ASYNC_DB_URL = make_async_url(DB_URL)
+engine = create_async_engine(ASYNC_DB_URL, **engine_options(ASYNC_DB_URL))
+install_query_hooks(engine.sync_engine)
+
+replica_engine = None
+if REPLICA_DATABASE_URL:
+    REPLICA_ASYNC_DB_URL = make_async_url(REPLICA_DATABASE_URL)
+    replica_engine = create_async_engine(REPLICA_ASYNC_DB_URL, **engine_options(REPLICA_ASYNC_DB_URL))
+    install_query_hooks(replica_engine.sync_engine)
+
+
+class RoutingSession(Session):
+    """Сессия с info['read_only'] читает из реплики, всё остальное - в primary."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if replica_engine is None or self._flushing or not self.info.get('read_only'):
+            return engine.sync_engine
+        return replica_engine.sync_engine
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def mark_write(session, flush_context):
+    session.info['wrote'] = True
+
+
+# expire_on_commit=False - после commit атрибуты не сбрасываются,
+# иначе pydantic при сериализации полезет в базу вне await
+SessionLocal = async_sessionmaker(class_=AsyncSession, sync_session_class=RoutingSession,
+                                  expire_on_commit=False)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+
+class LazySession:
+    """Прокси над AsyncSession.
+
+    Сессия создаётся при первом обращении (db.add, db.get, db.scalars ...),
+    поэтому обработчик, который вернул 404/422 до запроса в базу,
+    вообще не трогает пул соединений.
+    """
+
+    def __init__(self, factory=SessionLocal, read_only: bool = False):
+        self._factory = factory
+        self._read_only = read_only
+        self._session = None
+        self._wrote = False
+
+    def __getattr__(self, name):
+        if self._session is None:
+            self._session = self._factory()
+            self._session.info['read_only'] = self._read_only
+        return getattr(self._session, name)
+
+    @property
+    def wrote(self) -> bool:
+        return self._wrote or (self._session is not None and self._session.info.get('wrote', False))
+
+    async def release(self):
+        # закрываем сессию - соединение сразу возвращается в пул
+        if self._session is not None:
+            self._wrote = self.wrote
+            session, self._session = self._session, None
+            await session.close()
+
+
+def use_replica(request: Request) -> bool:
+    if replica_engine is None or request.method not in ('GET', 'HEAD'):
+        return False
+    # read-your-writes: клиент, который только что писал, читает из primary,
+    # пока реплика не догнала. Время последней записи лежит в cookie-сессии
+    last_write = request.session.get('last_write', 0) if 'session' in request.scope else 0
+    return time.time() - last_write > REPLICA_READ_YOUR_WRITES
+
+
+def remember_write(request: Request):
+    if 'session' in request.scope:
+        request.session['last_write'] = time.time()
+
+
+async def get_db(request: Request):
+    db = LazySession(read_only=use_replica(request))
+    request.state.db = db
     try:
         yield db
     finally:
-        db.close()
+        await db.release()
+
+
+class SessionRoute(APIRoute):
+    """Отдаёт соединение в пул как только тело ответа готово.
+
+    Выход из get_db выполняется уже после отправки ответа клиенту,
+    поэтому освобождаем сессию раньше - сразу после сериализации.
+    StreamingResponse читает из базы во время отправки, его не трогаем.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            response = None
+            try:
+                response = await handler(request)
+                return response
+            finally:
+                db = getattr(request.state, 'db', None)
+                if db is not None:
+                    if db.wrote:
+                        remember_write(request)
+                    if not isinstance(response, StreamingResponse):
+                        await db.release()
+
+        return route_handler
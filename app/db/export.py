@@ -0,0 +1,63 @@
+import csv
+import io
+import json
+from enum import Enum
+from fastapi.responses import StreamingResponse
+from app.config import EXPORT_BATCH_SIZE
+
+
+class ExportFormat(str, Enum):
+    csv = 'csv'
+    ndjson = 'ndjson'
+
+
+MEDIA_TYPES = {
+    ExportFormat.csv: 'text/csv; charset=utf-8',
+    ExportFormat.ndjson: 'application/x-ndjson',
+}
+
+
+def _plain(value):
+    # enum колонки приходят объектами BookingStatus/RoomType, в файл пишем значение
+    return value.value if isinstance(value, Enum) else value
+
+
+def _csv_chunk(rows, header=None) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header is not None:
+        writer.writerow(header)
+    writer.writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+def _ndjson_chunk(rows, columns) -> str:
+    return ''.join(json.dumps({column: _plain(value) for column, value in zip(columns, row)}, default=str, ensure_ascii=False) + '\n'
+                   for row in rows)
+
+
+async def _export_rows(db, query, export_format: ExportFormat):
+    try:
+        # серверный курсор: из базы забираем по EXPORT_BATCH_SIZE строк,
+        # в памяти держим только текущую пачку
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        columns = list(result.keys())
+        if export_format == ExportFormat.csv:
+            yield _csv_chunk([], header=columns)
+        async for rows in result.partitions():
+            if export_format == ExportFormat.csv:
+                yield _csv_chunk(rows)
+            else:
+                yield _ndjson_chunk(rows, columns)
+    finally:
+        # SessionRoute не закрывает сессию у StreamingResponse - закрываем сами, когда всё отдали
+        await db.release()
+
+
+def export_response(db, query, export_format: ExportFormat, filename: str) -> StreamingResponse:
+    """query - select(...) по колонкам, не по ORM объектам: строки не попадают в identity map."""
+    return StreamingResponse(
+        _export_rows(db, query, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}.{export_format.value}"'},
+    )
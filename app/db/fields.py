@@ -0,0 +1,57 @@
+from functools import lru_cache
+from typing import Optional
+from fastapi import HTTPException, Query
+from fastapi.responses import JSONResponse
+from pydantic import ConfigDict, create_model
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+
+
+class FieldsParam:
+    """?fields=id,hotel_name,stars - вернуть (и прочитать из базы) только эти поля."""
+
+    def __init__(self, fields: Optional[str] = Query(None, description='Comma separated list of fields')):
+        self.names = [name.strip() for name in fields.split(',') if name.strip()] if fields else []
+
+
+@lru_cache(maxsize=256)
+def trimmed_schema(schema, names: tuple):
+    # урезанная копия схемы с теми же типами и валидаторами полей
+    fields = {name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in names}
+    return create_model(f'{schema.__name__}Fields', __config__=ConfigDict(from_attributes=True), **fields)
+
+
+class SparseFields:
+    def __init__(self, model, schema, fields: FieldsParam, always=()):
+        self.schema = None
+        self.options = []
+        if not fields.names:
+            return
+
+        columns = {attr.key: attr for attr in inspect(model).column_attrs}
+        unknown = [name for name in fields.names if name not in schema.model_fields or name not in columns]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+        names = tuple(dict.fromkeys(fields.names))
+        self.schema = trimmed_schema(schema, names)
+        # первичный ключ load_only подгружает сам, он нужен identity map и курсору;
+        # always - колонки, которые нужны самому эндпоинту (например ключ сортировки для курсора)
+        columns = [getattr(model, name) for name in names]
+        columns += [column for column in always if column is not None and column.key not in names]
+        self.options = [load_only(*columns)]
+
+    def dump(self, obj) -> dict:
+        return self.schema.model_validate(obj).model_dump(mode='json')
+
+    def one(self, obj):
+        # без fields отдаём объект как есть - его сериализует response_model эндпоинта
+        if self.schema is None:
+            return obj
+        return JSONResponse(self.dump(obj))
+
+    def page(self, page: dict):
+        if self.schema is None:
+            return page
+        return JSONResponse({'items': [self.dump(obj) for obj in page['items']],
+                             'next_cursor': page['next_cursor']})
@@ -0,0 +1,62 @@
+import math
+import numpy as np
+from sqlalchemy import select, and_, or_
+from app.db.models import Hotel
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def bounding_box(lat: float, lon: float, radius_km: float):
+    """Прямоугольник (min_lat, max_lat, min_lon, max_lon), в который точно влезает круг радиуса radius_km.
+    Долгота может выйти за ±180 - это разбирает nearby_candidates_query."""
+    delta_lat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = lat - delta_lat, lat + delta_lat
+    if min_lat <= -90 or max_lat >= 90:
+        # круг задевает полюс - берём все долготы
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+    # градус долготы короче к полюсам, считаем по самой дальней от экватора широте круга
+    delta_lon = radius_km / (KM_PER_DEGREE * math.cos(math.radians(max(abs(min_lat), abs(max_lat)))))
+    if delta_lon >= 180:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, lon - delta_lon, lon + delta_lon
+
+
+def nearby_candidates_query(lat: float, lon: float, radius_km: float):
+    # грубый отбор по индексу ix_hotel_latitude_longitude, точное расстояние считает haversine_km
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    if min_lon < -180:
+        lon_filter = or_(Hotel.longitude >= min_lon + 360, Hotel.longitude <= max_lon)
+    elif max_lon > 180:
+        lon_filter = or_(Hotel.longitude >= min_lon, Hotel.longitude <= max_lon - 360)
+    else:
+        lon_filter = Hotel.longitude.between(min_lon, max_lon)
+    return select(Hotel.id, Hotel.latitude, Hotel.longitude).where(
+        and_(Hotel.latitude.between(min_lat, max_lat), lon_filter))
+
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def nearest(candidates, lat: float, lon: float, radius_km: float, after=None):
+    """candidates - строки (id, latitude, longitude). Возвращает (ids, distances) внутри радиуса,
+    по возрастанию расстояния, при равенстве - по id. after - (distance, id) последней отданной строки."""
+    if not candidates:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float64)
+    ids, lats, lons = (np.asarray(values) for values in zip(*candidates))
+    ids = ids.astype(np.int64)
+    distances = haversine_km(lat, lon, lats.astype(np.float64), lons.astype(np.float64))
+
+    mask = distances <= radius_km
+    if after is not None:
+        last_distance, last_id = after
+        mask &= (distances > last_distance) | ((distances == last_distance) & (ids > last_id))
+    ids, distances = ids[mask], distances[mask]
+    order = np.lexsort((ids, distances))
+    return ids[order], distances[order]
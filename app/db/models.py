@@ -1,7 +1,9 @@
 from datetime import datetime, date
-from sqlalchemy import (Integer, String, Enum, DateTime, DECIMAL,
-                        Text, ForeignKey, Column, Table, Date)
+from sqlalchemy import (Integer, String, Enum, DateTime, DECIMAL, Float,
+                        Text, ForeignKey, Column, Table, Date, Index)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
+from sqlalchemy import text
 from typing import Optional, List
 from app.db.database import Base
 from enum import Enum as PyEnum
@@ -49,6 +51,7 @@ class Country(Base):
     id: Mapped[int] = mapped_column(Integer, autoincrement=True, primary_key=True, index=True)
     country_name: Mapped[String] = mapped_column(String(16), unique=True, index=True )
     country_image: Mapped[String] = mapped_column(String, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     hotels: Mapped[List['Hotel']] =relationship('Hotel', back_populates='country')
 
@@ -102,6 +105,7 @@ class City(Base):
     id: Mapped[int] = mapped_column(Integer, autoincrement=True, primary_key=True, index=True)
     city_name: Mapped[String] = mapped_column(String(16), index=True)
     city_image: Mapped[String] = mapped_column(String, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     hotels: Mapped[List['Hotel']] = relationship('Hotel', back_populates='city')
 
@@ -113,6 +117,7 @@ class Service(Base):
     id: Mapped[int] = mapped_column(Integer, autoincrement=True, primary_key=True)
     service_name: Mapped[String] = mapped_column(String(32))
     service_image: Mapped[String] = mapped_column(String, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     hotels: Mapped[List['Hotel']] = relationship('Hotel',
                                                     secondary=hotel_service,
@@ -124,6 +129,18 @@ class Service(Base):
 
 class Hotel(Base):
     __tablename__ = 'hotel'
+    __table_args__ = (
+        # фильтры и сортировки списка отелей (app/api/hotel.py), id в конце - для курсора
+        Index('ix_hotel_city_id_stars_id', 'city_id', 'stars', 'id'),
+        Index('ix_hotel_country_id_stars_id', 'country_id', 'stars', 'id'),
+        Index('ix_hotel_owner_id_id', 'owner_id', 'id'),
+        Index('ix_hotel_stars_id', 'stars', 'id'),
+        Index('ix_hotel_hotel_name_id', 'hotel_name', 'id'),
+        # поиск отелей рядом (app/db/geo.py): диапазон по широте, долгота фильтром по индексу
+        Index('ix_hotel_latitude_longitude', 'latitude', 'longitude'),
+        Index('ix_hotel_rating_avg_id', 'rating_avg', 'id'),
+        Index('ix_hotel_city_id_rating_avg_id', 'city_id', 'rating_avg', 'id'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, autoincrement=True, primary_key=True)
     hotel_name: Mapped[str] = mapped_column(String(64))
@@ -131,6 +148,22 @@ class Hotel(Base):
     street: Mapped[str] = mapped_column(String(100), nullable=True)
     postal_index: Mapped[str] = mapped_column(String(32), nullable=True)
     description: Mapped[str] = mapped_column(Text)
+    latitude: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    longitude: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+    # агрегаты отзывов, их поддерживают обработчики review (app/db/rating.py)
+    # 0 пока нет оценок (см. rating_count) - без NULL сортировка по убыванию ставит их в конец
+    rating_avg: Mapped[float] = mapped_column(Float, default=0, server_default='0')
+    rating_count: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+    rating_sum: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+    rating_1: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+    rating_2: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+    rating_3: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+    rating_4: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+    rating_5: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+
+    # время последней записи, в том числе агрегатов рейтинга: из него ETag и Last-Modified (app/db/conditional.py)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     country_id: Mapped[int] = mapped_column(ForeignKey('country.id'))
     country: Mapped[Country] = relationship('Country', back_populates='hotels')
@@ -156,6 +189,8 @@ class Hotel(Base):
     hotel_reviews: Mapped[List['Review']] = relationship('Review', back_populates='hotel', cascade=
                                                          'all, delete-orphan')
 
+    rooms: Mapped[List['Room']] = relationship('Room', back_populates='hotel')
+
     hotel_favourites: Mapped[List['FavouriteItem']] = relationship('FavouriteItem', back_populates='hotel',
                                                                    cascade='all, delete-orphan')
 
@@ -166,6 +201,9 @@ class Hotel(Base):
 
 class HotelImage(Base):
     __tablename__ ='hotel_image'
+    __table_args__ = (
+        Index('ix_hotel_image_hotel_id', 'hotel_id'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, autoincrement=True, primary_key=True)
     hotel_image: Mapped[str] = mapped_column(String, nullable=True)
@@ -179,6 +217,14 @@ class HotelImage(Base):
 
 class Room(Base):
     __tablename__ = 'room'
+    __table_args__ = (
+        # фильтры и сортировки списка комнат (app/api/room.py), id в конце - для курсора
+        Index('ix_room_hotel_id_price_id', 'hotel_id', 'price', 'id'),
+        Index('ix_room_room_type_price_id', 'room_type', 'price', 'id'),
+        Index('ix_room_room_status_price_id', 'room_status', 'price', 'id'),
+        Index('ix_room_price_id', 'price', 'id'),
+        Index('ix_room_max_guests_id', 'max_guests', 'id'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, autoincrement=True, primary_key=True)
     room_number: Mapped[str] = mapped_column(String(10))
@@ -187,6 +233,10 @@ class Room(Base):
     room_description: Mapped[str] = mapped_column(Text)
     price: Mapped[Decimal] = mapped_column(DECIMAL(10,2))
     max_guests: Mapped[int] = mapped_column(Integer, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    hotel_id: Mapped[Optional[int]] = mapped_column(ForeignKey('hotel.id'), nullable=True, index=True)
+    hotel: Mapped[Optional[Hotel]] = relationship('Hotel', back_populates='rooms')
 
     room_images: Mapped[List['RoomImage']] = relationship('RoomImage', back_populates='room',
                                                           cascade='all, delete-orphan')
@@ -214,6 +264,16 @@ class RoomImage(Base):
 
 class Booking(Base):
     __tablename__ = 'booking'
+    __table_args__ = (
+        # поиск пересечений по датам для одной комнаты (app/db/availability.py)
+        Index('ix_booking_room_id_check_in_check_out', 'room_id', 'check_in', 'check_out'),
+        # в postgres база сама не даст забронировать одну комнату на пересекающиеся даты
+        ExcludeConstraint(('room_id', '='), (text('daterange(check_in, check_out)'), '&&'),
+                          name='booking_room_id_dates_excl', using='gist',
+                          where=text("booking_status != 'cancelled' "
+                                     "AND check_in IS NOT NULL AND check_out IS NOT NULL")
+                          ).ddl_if(dialect='postgresql'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, autoincrement=True, primary_key=True)
     check_in: Mapped[date] = mapped_column(Date, nullable=True)
@@ -236,10 +296,15 @@ class Booking(Base):
 
 class Review(Base):
     __tablename__  = 'review'
+    __table_args__ = (
+        # отзывы отеля: последние по id и агрегаты (GET /hotel/{id}/full/)
+        Index('ix_review_hotel_id_id', 'hotel_id', 'id'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, autoincrement=True, primary_key=True)
     stars: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     comment: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     hotel_id: Mapped[int] = mapped_column(ForeignKey('hotel.id'))
     hotel: Mapped[Hotel] = relationship('Hotel', back_populates='hotel_reviews')
@@ -286,10 +351,12 @@ class RefreshToken(Base):
     __tablename__ = 'refresh_token'
 
     id: Mapped[int] = mapped_column(Integer, autoincrement=True, primary_key=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey('userprofile.id'))
+    user_id: Mapped[int] = mapped_column(ForeignKey('userprofile.id'), index=True)
     user: Mapped[UserProfile] = relationship('UserProfile', back_populates='refresh_tokens')
-    token: Mapped[str] = mapped_column(String(512), nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # sha256 токена (app/db/refresh_tokens.py): сам токен в базе не храним, поиск по уникальному индексу
+    token_hash: Mapped[str] = mapped_column(String(64), nullable=False, unique=True, index=True)
+    # по нему фоновая чистка удаляет просроченные
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
 
 
 
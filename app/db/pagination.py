@@ -0,0 +1,144 @@
+import base64
+import json
+import math
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+from fastapi import HTTPException, Query
+from sqlalchemy import and_, or_
+from app.config import PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT
+
+
+class PageParams:
+    """?limit=&after= для всех list эндпоинтов, after - курсор из next_cursor прошлой страницы."""
+
+    def __init__(self, limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
+                 after: Optional[str] = None):
+        self.limit = limit
+        self.after = after
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps(values, default=str, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+    if not isinstance(values, list) or not values:
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+    return values
+
+
+def _cursor_value(column, value):
+    # в курсоре всё лежит строками/числами json, возвращаем python тип колонки
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type in (date, datetime):
+        return python_type.fromisoformat(value)
+    value = python_type(value)
+    if python_type in (float, Decimal) and not math.isfinite(value):
+        # NaN/Infinity из самодельного курсора - тоже битый курсор
+        raise ValueError(value)
+    return value
+
+
+def _after(query, values: list, id_column, sort_column, descending: bool):
+    if len(values) != (1 if sort_column is None else 2):
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+    try:
+        last_id = _cursor_value(id_column, values[-1])
+        last_sort = _cursor_value(sort_column, values[0]) if sort_column is not None else None
+    except (TypeError, ValueError, ArithmeticError):
+        # ArithmeticError - decimal.InvalidOperation от Decimal('abc') для DECIMAL колонок (price)
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+
+    if sort_column is None:
+        return query.where(id_column < last_id if descending else id_column > last_id)
+
+    next_id = id_column < last_id if descending else id_column > last_id
+    # NULL считаем больше любого значения (как postgres по умолчанию):
+    # при ASC они в конце, при DESC - в начале
+    if last_sort is None:
+        if descending:
+            return query.where(or_(sort_column.isnot(None), and_(sort_column.is_(None), next_id)))
+        return query.where(sort_column.is_(None), next_id)
+
+    # (sort, id) > (last_sort, last_id) - раскрыто через OR, чтобы работало и в sqlite
+    beyond = sort_column < last_sort if descending else sort_column > last_sort
+    conditions = [beyond, and_(sort_column == last_sort, next_id)]
+    if sort_column.nullable and not descending:
+        conditions.append(sort_column.is_(None))
+    return query.where(or_(*conditions))
+
+
+def _order(sort_column, descending: bool):
+    if descending:
+        return sort_column.desc().nulls_first() if sort_column.nullable else sort_column.desc()
+    return sort_column.asc().nulls_last() if sort_column.nullable else sort_column.asc()
+
+
+def keyset_query(query, page: PageParams, id_column, sort_column=None, descending: bool = False):
+    if page.after:
+        query = _after(query, decode_cursor(page.after), id_column, sort_column, descending)
+
+    order = [] if sort_column is None else [_order(sort_column, descending)]
+    order.append(id_column.desc() if descending else id_column)
+    # +1 строка - чтобы узнать, есть ли следующая страница, без COUNT(*)
+    # свою сортировку запроса заменяем - курсор держится только на (sort, id)
+    return query.order_by(None).order_by(*order).limit(page.limit + 1)
+
+
+def make_page(rows, page: PageParams, id_attr: str = 'id', sort_attr: Optional[str] = None) -> dict:
+    rows = list(rows)
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        last = rows[-1]
+        values = [getattr(last, id_attr)] if sort_attr is None else [getattr(last, sort_attr), getattr(last, id_attr)]
+        next_cursor = encode_cursor(values)
+    return {'items': rows, 'next_cursor': next_cursor}
+
+
+async def paginate(db, query, page: PageParams, id_column, sort_column=None, descending: bool = False) -> dict:
+    rows = (await db.scalars(keyset_query(query, page, id_column, sort_column, descending))).all()
+    return make_page(rows, page, id_column.key, sort_column.key if sort_column is not None else None)
+
+
+def sort_param(sort: str, columns: dict):
+    """sort=price / sort=-price -> (колонка, descending). columns - белый список ключей сортировки,
+    значение None - сортировка только по id."""
+    descending = sort.startswith('-')
+    key = sort.lstrip('-')
+    if key not in columns:
+        raise HTTPException(status_code=400, detail=f"Unknown sort key: {key}. Allowed: {', '.join(columns)}")
+    return columns[key], descending
+
+
+def _ids_after(ids: list, page: PageParams) -> list:
+    if page.after:
+        values = decode_cursor(page.after)
+        if len(values) != 1 or not isinstance(values[0], int):
+            raise HTTPException(status_code=400, detail='Invalid cursor')
+        ids = [item_id for item_id in ids if item_id > values[0]]
+    return ids
+
+
+async def paginate_candidates(db, query, id_column, candidate_ids: list, page: PageParams) -> dict:
+    """Keyset по отсортированному списку id-кандидатов (поиск в памяти), каждый кандидат
+    перепроверяется точным запросом query. Кандидатов берём пачками: отброшенные проверкой
+    не укорачивают страницу и не сбивают курсор."""
+    candidate_ids = _ids_after(candidate_ids, page)
+    need = page.limit + 1
+    rows = []
+    start = 0
+    while len(rows) < need and start < len(candidate_ids):
+        chunk = candidate_ids[start:start + need]
+        start += len(chunk)
+        rows += (await db.scalars(query.where(id_column.in_(chunk)).order_by(None).order_by(id_column))).all()
+    return make_page(rows, page, id_column.key)
@@ -0,0 +1,67 @@
+import time
+from bisect import bisect_left
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class CheckoutHistogram:
+    # верхние границы корзин в миллисекундах, последняя корзина - всё что больше
+    BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        self.timeouts = 0
+
+    def observe(self, wait_ms: float):
+        self.counts[bisect_left(self.BUCKETS, wait_ms)] += 1
+        self.total += 1
+        self.sum_ms += wait_ms
+        self.max_ms = max(self.max_ms, wait_ms)
+
+    def snapshot(self) -> dict:
+        labels = [f'le_{bound}' for bound in self.BUCKETS] + ['inf']
+        return {
+            'count': self.total,
+            'timeouts': self.timeouts,
+            'avg_ms': round(self.sum_ms / self.total, 3) if self.total else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool, который меряет сколько запрос ждал соединение."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_wait = CheckoutHistogram()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.checkout_wait.timeouts += 1
+            raise
+        finally:
+            self.checkout_wait.observe((time.perf_counter() - start) * 1000)
+
+
+def pool_stats(pool) -> dict:
+    stats = {'pool_class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'idle': pool.checkedin(),
+            # overflow() отрицательный пока пул не заполнен до pool_size
+            'overflow': max(pool.overflow(), 0),
+            'max_overflow': pool._max_overflow,
+            'timeout': pool.timeout(),
+        })
+    if isinstance(pool, TimedQueuePool):
+        stats['checkout_wait_ms'] = pool.checkout_wait.snapshot()
+    return stats
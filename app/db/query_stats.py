@@ -0,0 +1,58 @@
+import time
+import logging
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from app.config import DB_SLOW_QUERY_MS, DB_N_PLUS_ONE_THRESHOLD
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """Счётчик SQL запросов одного HTTP запроса."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        # statement -> множество разных параметров, с которыми он выполнялся
+        self.statements = {}
+
+    def record(self, statement: str, parameters, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.statements.setdefault(statement, set()).add(repr(parameters))
+
+    def n_plus_one(self) -> dict:
+        # один и тот же запрос с разными параметрами много раз подряд - почти всегда lazy load в цикле
+        return {statement: len(params) for statement, params in self.statements.items()
+                if len(params) >= DB_N_PLUS_ONE_THRESHOLD}
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar('query_stats', default=None)
+
+
+def start_query_stats() -> QueryStats:
+    stats = QueryStats()
+    _current_stats.set(stats)
+    return stats
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info['query_start'].pop()) * 1000
+
+    if elapsed_ms > DB_SLOW_QUERY_MS:
+        logger.warning('slow query %.2f ms: %s | params: %r', elapsed_ms, statement, parameters)
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, parameters, elapsed_ms)
+
+
+def install_query_hooks(sync_engine):
+    event.listen(sync_engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(sync_engine, 'after_cursor_execute', after_cursor_execute)
@@ -0,0 +1,33 @@
+from typing import Optional
+from sqlalchemy import update, case, cast, Float
+from app.db.models import Hotel
+
+
+STAR_COLUMNS = {stars: getattr(Hotel, f'rating_{stars}') for stars in range(1, 6)}
+
+
+def rating_delta(hotel_id: int, stars: Optional[int], step: int):
+    """UPDATE, который добавляет (step=1) или убирает (step=-1) одну оценку из агрегатов отеля.
+
+    Считаем от текущих значений строки, а не пересчётом по всем отзывам. Выполняется в той же
+    транзакции, что и запись отзыва; UPDATE одной строки атомарный, параллельные отзывы не теряются.
+    Отзыв без звёзд в рейтинг не входит - тогда возвращает None.
+    """
+    if stars is None:
+        return None
+    count = Hotel.rating_count + step
+    total = Hotel.rating_sum + step * stars
+    # в SET справа везде старые значения строки, поэтому avg считаем от тех же выражений
+    return update(Hotel).where(Hotel.id == hotel_id).values({
+        Hotel.rating_count: count,
+        Hotel.rating_sum: total,
+        STAR_COLUMNS[stars]: STAR_COLUMNS[stars] + step,
+        Hotel.rating_avg: case((count > 0, cast(total, Float) / count), else_=0),
+    })
+
+
+def rating_changes(hotel_id: int, old_stars: Optional[int], new_stars: Optional[int]):
+    if old_stars == new_stars:
+        return []
+    statements = [rating_delta(hotel_id, old_stars, -1), rating_delta(hotel_id, new_stars, 1)]
+    return [statement for statement in statements if statement is not None]
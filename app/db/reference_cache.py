@@ -0,0 +1,191 @@
+import asyncio
+import logging
+from sqlalchemy import select, text
+from app.config import CACHE_REDIS_URL
+from app.db.database import engine
+from app.db.models import Country, City, Service
+
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'reference_data'
+
+
+class Record:
+    """Строка справочника: только __slots__, без ORM состояния - дёшево держать в памяти."""
+    __slots__ = ()
+    name_field = None
+
+    def __init__(self, *values):
+        for field, value in zip(self.__slots__, values):
+            setattr(self, field, value)
+
+    @property
+    def name(self):
+        return getattr(self, self.name_field)
+
+
+class CountryRecord(Record):
+    __slots__ = ('id', 'country_name', 'country_image', 'updated_at')
+    name_field = 'country_name'
+
+
+class CityRecord(Record):
+    __slots__ = ('id', 'city_name', 'city_image', 'updated_at')
+    name_field = 'city_name'
+
+
+class ServiceRecord(Record):
+    __slots__ = ('id', 'service_name', 'service_image', 'updated_at')
+    name_field = 'service_name'
+
+
+class ReferenceTable:
+    def __init__(self, model, record_class):
+        self.model = model
+        self.record_class = record_class
+        self.by_id = {}
+        self.by_name = {}
+        self.ready = False
+
+    def query(self):
+        return select(*(getattr(self.model, field) for field in self.record_class.__slots__))
+
+    def load(self, rows):
+        records = [self.record_class(*row) for row in rows]
+        # подменяем словари целиком - читатели не увидят полузагруженную таблицу
+        self.by_id = {record.id: record for record in records}
+        self.by_name = {record.name.casefold(): record for record in records if record.name}
+        self.ready = True
+
+    def get(self, item_id: int):
+        return self.by_id.get(item_id)
+
+    def get_by_name(self, name: str):
+        return self.by_name.get(name.casefold())
+
+
+class ReferenceCache:
+    """Страны, города и сервисы целиком в памяти каждого воркера.
+
+    Меняются они редко, поэтому после записи таблица просто перечитывается.
+    Свой воркер перечитывает сразу, остальным уходит сообщение в канал:
+    redis pub/sub, если задан CACHE_REDIS_URL, иначе LISTEN/NOTIFY postgres.
+    На sqlite канала нет - кэш обновляется только в своём процессе.
+    """
+
+    def __init__(self):
+        self.tables = {
+            'country': ReferenceTable(Country, CountryRecord),
+            'city': ReferenceTable(City, CityRecord),
+            'service': ReferenceTable(Service, ServiceRecord),
+        }
+        self._redis = None
+
+    def country(self, country_id: int):
+        return self.tables['country'].get(country_id)
+
+    def city(self, city_id: int):
+        return self.tables['city'].get(city_id)
+
+    def service(self, service_id: int):
+        return self.tables['service'].get(service_id)
+
+    async def reload(self, session_factory, kind: str):
+        table = self.tables[kind]
+        async with session_factory() as db:
+            rows = (await db.execute(table.query())).all()
+        table.load(rows)
+
+    async def reload_all(self, session_factory):
+        for kind in self.tables:
+            await self.reload(session_factory, kind)
+        logger.info('reference cache: %s', ', '.join(f'{len(table.by_id)} {kind}'
+                                                     for kind, table in self.tables.items()))
+
+    async def changed(self, session_factory, kind: str):
+        """Вызывается после commit записи в справочник."""
+        await self.reload(session_factory, kind)
+        try:
+            await self._publish(kind)
+        except Exception:
+            logger.exception('reference cache: failed to notify other workers')
+
+    # ---------- канал между воркерами ----------
+
+    def _redis_client(self):
+        if self._redis is None:
+            from redis import asyncio as redis_asyncio
+            self._redis = redis_asyncio.from_url(CACHE_REDIS_URL)
+        return self._redis
+
+    async def _publish(self, kind: str):
+        if CACHE_REDIS_URL:
+            await self._redis_client().publish(CHANNEL, kind)
+        elif engine.dialect.name == 'postgresql':
+            async with engine.begin() as conn:
+                await conn.execute(text('SELECT pg_notify(:channel, :kind)'), {'channel': CHANNEL, 'kind': kind})
+
+    async def _listen_redis(self, queue: asyncio.Queue, on_ready):
+        pubsub = self._redis_client().pubsub()
+        try:
+            await pubsub.subscribe(CHANNEL)
+            await on_ready()
+            async for message in pubsub.listen():
+                if message['type'] == 'message':
+                    queue.put_nowait(message['data'].decode())
+        finally:
+            await pubsub.aclose()
+
+    async def _listen_postgres(self, queue: asyncio.Queue, on_ready):
+        # отдельное соединение из пула держим под LISTEN, пока воркер жив
+        async with engine.connect() as conn:
+            connection = (await conn.get_raw_connection()).driver_connection
+            closed = asyncio.get_running_loop().create_future()
+            listener = lambda _connection, _pid, _channel, payload: queue.put_nowait(payload)
+            await connection.add_listener(CHANNEL, listener)
+            connection.add_termination_listener(lambda _connection: closed.done() or closed.set_result(None))
+            try:
+                await on_ready()
+                await closed
+            finally:
+                if not connection.is_closed():
+                    await connection.remove_listener(CHANNEL, listener)
+
+    async def listen(self, session_factory):
+        """Фоновая задача воркера: перечитывает таблицы по сообщениям других воркеров."""
+        if CACHE_REDIS_URL:
+            subscribe = self._listen_redis
+        elif engine.dialect.name == 'postgresql':
+            subscribe = self._listen_postgres
+        else:
+            return
+
+        queue = asyncio.Queue()
+
+        async def apply():
+            while True:
+                kind = await queue.get()
+                if kind in self.tables:
+                    try:
+                        await self.reload(session_factory, kind)
+                    except Exception:
+                        logger.exception('reference cache reload failed')
+
+        # пока были отключены от канала, сообщения могли потеряться - после подписки перечитываем всё
+        on_ready = lambda: self.reload_all(session_factory)
+        applier = asyncio.create_task(apply())
+        try:
+            while True:
+                try:
+                    await subscribe(queue, on_ready)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception('reference cache listener failed, reconnecting')
+                await asyncio.sleep(5)
+        finally:
+            applier.cancel()
+
+
+reference_cache = ReferenceCache()
@@ -0,0 +1,46 @@
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select
+from app.config import REFRESH_TOKEN_LIFETIME, REFRESH_TOKEN_PURGE_SECONDS, REFRESH_TOKEN_PURGE_BATCH
+from app.db.models import RefreshToken
+
+
+logger = logging.getLogger(__name__)
+
+
+def hash_token(token: str) -> str:
+    # токен - подписанный jwt со случайной энтропией, медленный хеш (bcrypt) ему не нужен
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def consume_token_query(token: str):
+    """Удалить токен и вернуть его user_id одним запросом: при двух одновременных
+    /refresh с одним токеном строку получит только один из них."""
+    return delete(RefreshToken).where(RefreshToken.token_hash == hash_token(token)).returning(RefreshToken.user_id)
+
+
+async def purge_expired_refresh_tokens(session_factory, batch_size: int = REFRESH_TOKEN_PURGE_BATCH) -> int:
+    cutoff = datetime.utcnow() - timedelta(days=REFRESH_TOKEN_LIFETIME)
+    purged = 0
+    while True:
+        # пачками по индексу created_at, каждая в своей короткой транзакции - без долгих блокировок
+        async with session_factory() as db:
+            expired = select(RefreshToken.id).where(RefreshToken.created_at < cutoff).limit(batch_size)
+            result = await db.execute(delete(RefreshToken).where(RefreshToken.id.in_(expired.scalar_subquery())))
+            await db.commit()
+        purged += result.rowcount
+        if result.rowcount < batch_size:
+            return purged
+
+
+async def purge_refresh_tokens_periodically(session_factory):
+    while True:
+        try:
+            purged = await purge_expired_refresh_tokens(session_factory)
+            if purged:
+                logger.info('refresh tokens: purged %d expired', purged)
+        except Exception:
+            logger.exception('refresh token purge failed')
+        await asyncio.sleep(REFRESH_TOKEN_PURGE_SECONDS)
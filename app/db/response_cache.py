@@ -0,0 +1,212 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Iterable, Optional
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from app.config import CACHE_REDIS_URL, CACHE_TTL_SECONDS, CACHE_MEMORY_MAX_ENTRIES, CACHE_PREFIX
+from app.db.database import SessionRoute, use_replica
+from app.db.conditional import is_not_modified
+from app.db.coalesce import single_flight, request_key, copy_response
+
+
+logger = logging.getLogger(__name__)
+
+REPLAYED_HEADERS = ('content-type', 'etag', 'last-modified', 'cache-control')
+
+
+# Инвалидация по тегам через версии: у каждого тега есть счётчик, версии всех тегов ответа
+# входят в ключ кэша. Запись увеличивает счётчик - старые ключи больше никто не спросит,
+# они доживают до TTL. Не нужно хранить и обходить списки ключей тега.
+
+class MemoryCacheBackend:
+    """Для тестов и одного процесса: у каждого воркера свой кэш и свои версии тегов."""
+
+    def __init__(self, max_entries: int = CACHE_MEMORY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._versions = {}
+
+    async def tag_versions(self, tags: list) -> list:
+        return [self._versions.get(tag, 0) for tag in tags]
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def invalidate(self, tags: list):
+        for tag in tags:
+            self._versions[tag] = self._versions.get(tag, 0) + 1
+
+
+class RedisCacheBackend:
+    """Общий кэш для всех воркеров и инстансов."""
+
+    def __init__(self, url: str):
+        # redis.asyncio - бывший aioredis, влитый в redis-py
+        from redis import asyncio as redis_asyncio
+        self.redis = redis_asyncio.from_url(url)
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f'{CACHE_PREFIX}:tag:{tag}'
+
+    async def tag_versions(self, tags: list) -> list:
+        if not tags:
+            return []
+        return [int(version or 0) for version in await self.redis.mget([self._tag_key(tag) for tag in tags])]
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.redis.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        await self.redis.set(key, value, ex=ttl)
+
+    async def invalidate(self, tags: list):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.incr(self._tag_key(tag))
+            await pipe.execute()
+
+
+class ResponseCache:
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def _key(self, request: Request, tags: list) -> str:
+        versions = await self.backend.tag_versions(tags)
+        query = '&'.join(sorted(f'{name}={value}' for name, value in request.query_params.multi_items()))
+        tag_part = ','.join(f'{tag}={version}' for tag, version in zip(tags, versions))
+        # ответы с реплики и с primary храним раздельно: реплика может отставать, и её ответ,
+        # сохранённый уже под новой версией тега, иначе получил бы автор записи (read-your-writes)
+        source = 'replica' if use_replica(request) else 'primary'
+        return f'{CACHE_PREFIX}:response:{source}:{request.url.path}?{query}#{tag_part}'
+
+    async def load(self, request: Request, tags: list):
+        # ошибки кэша не должны ронять запрос - тогда просто идём в базу
+        try:
+            key = await self._key(request, tags)
+            return key, await self.backend.get(key)
+        except Exception:
+            logger.exception('response cache read failed')
+            return None, None
+
+    async def store(self, key: str, response: Response, ttl: int):
+        # первая строка - заголовки, которые нужно отдать вместе с телом (тип, ETag, Last-Modified)
+        headers = {name: response.headers[name] for name in REPLAYED_HEADERS if name in response.headers}
+        try:
+            await self.backend.set(key, json.dumps(headers).encode() + b'\n' + response.body, ttl)
+        except Exception:
+            logger.exception('response cache write failed')
+
+    async def invalidate(self, tags: Iterable[str]):
+        try:
+            await self.backend.invalidate(list(tags))
+        except Exception:
+            logger.exception('response cache invalidation failed')
+
+
+response_cache = ResponseCache(RedisCacheBackend(CACHE_REDIS_URL) if CACHE_REDIS_URL else MemoryCacheBackend())
+
+
+def cache_response(*tags: str, ttl: int = CACHE_TTL_SECONDS):
+    """Кэшировать ответ GET эндпоинта. Теги могут ссылаться на параметры пути: 'hotel:{hotel_id}'."""
+    def decorator(endpoint):
+        endpoint.cache_tags = tags
+        endpoint.cache_ttl = ttl
+        return endpoint
+    return decorator
+
+
+def invalidate_cache(*tags: str):
+    """После успешного ответа эндпоинта сбросить закэшированные ответы с этими тегами."""
+    def decorator(endpoint):
+        endpoint.invalidates = tags
+        return endpoint
+    return decorator
+
+
+def _tags(templates, request: Request) -> list:
+    return [template.format(**request.path_params) for template in templates]
+
+
+def _cached_response(request: Request, cached: bytes) -> Response:
+    header_line, _, body = cached.partition(b'\n')
+    headers = json.loads(header_line)
+    etag = headers.get('etag')
+    if etag is not None:
+        last_modified = headers.get('last-modified')
+        if is_not_modified(request, etag, parsedate_to_datetime(last_modified) if last_modified else None):
+            headers.pop('content-type', None)
+            return Response(status_code=304, headers={**headers, 'X-Cache': 'HIT'})
+    return Response(body, headers={**headers, 'X-Cache': 'HIT'})
+
+
+class CachedRoute(SessionRoute):
+    """SessionRoute + кэш ответов для эндпоинтов с @cache_response и сброс тегов для @invalidate_cache.
+    При попадании в кэш обработчик не вызывается вовсе - ни зависимостей, ни сессии, ни запросов в базу.
+    Валидаторы, которые посчитал обработчик (app/db/conditional.py), добавляются в заголовки ответа
+    и хранятся в кэше вместе с телом. Эндпоинты с @coalesce_requests объединяют одновременные
+    одинаковые GET (app/db/coalesce.py)."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        cache_tags = getattr(self.endpoint, 'cache_tags', None)
+        invalidates = getattr(self.endpoint, 'invalidates', None)
+        coalesce = getattr(self.endpoint, 'coalesce', False)
+
+        async def run_handler(request: Request) -> Response:
+            response = await handler(request)
+            validators = getattr(request.state, 'validators', None)
+            if validators is not None and response.status_code == 200:
+                response.headers.update(validators)
+            return response
+
+        async def load_response(request: Request) -> Response:
+            if cache_tags is not None and request.method == 'GET':
+                key, cached = await response_cache.load(request, _tags(cache_tags, request))
+                if cached is not None:
+                    return _cached_response(request, cached)
+
+                response = await run_handler(request)
+                if key is not None and response.status_code == 200 and not isinstance(response, StreamingResponse):
+                    await response_cache.store(key, response, self.endpoint.cache_ttl)
+                    response.headers['X-Cache'] = 'MISS'
+                return response
+            return await run_handler(request)
+
+        async def route_handler(request: Request) -> Response:
+            if coalesce and request.method == 'GET':
+                # промах кэша выполняет один запрос, остальные одинаковые ждут его ответ
+                response, joined = await single_flight.do(request_key(request), self.path_format,
+                                                          lambda: load_response(request))
+                if not joined or isinstance(response, StreamingResponse):
+                    return response
+                response = copy_response(response)
+                response.headers['X-Coalesced'] = '1'
+                return response
+
+            if request.method == 'GET':
+                return await load_response(request)
+
+            response = await run_handler(request)
+            if invalidates is not None and 200 <= response.status_code < 300:
+                await response_cache.invalidate(_tags(invalidates, request))
+            return response
+
+        return route_handler
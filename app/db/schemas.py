@@ -1,9 +1,23 @@
 from pydantic import BaseModel, Field, EmailStr, validator, ConfigDict
-from typing import Optional, List
+from typing import Optional, List, Dict, Generic, TypeVar
 from app.db.models import RoomStatus, BookingStatus, RoomType, RoleChoices
 from datetime import datetime, date
 
 
+T = TypeVar('T')
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+class AutocompleteItemSchema(BaseModel):
+    kind: str # country / city / hotel
+    id: int
+    name: str
+
+
 
 class CountryOutSchema(BaseModel):
     id: int
@@ -41,6 +55,17 @@ class UserProfileSchema(BaseModel):
         from_attributes = True
 
 
+class CurrentUserSchema(BaseModel):
+    id: int
+    user_name: str
+    first_name: str
+    last_name: str
+    role: RoleChoices
+
+    class Config:
+        from_attributes = True
+
+
 class UserProfileLoginSchema(BaseModel):
     user_name: EmailStr
     password: str
@@ -158,6 +183,23 @@ class HotelOutSchema(BaseModel):
     country_id: int
     city_id: int
     owner_id: int
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    rating_avg: float = 0
+    rating_count: int = 0
+
+    class Config:
+        from_attributes = True
+
+
+class HotelSearchSchema(BaseModel):
+    id: int
+    hotel_name: str
+    stars: Optional[int] = None
+    country_id: int
+    city_id: int
+    rank: float
+    highlight: Optional[str] = None # фрагмент описания, совпадения в <b></b>
 
     class Config:
         from_attributes = True
@@ -172,11 +214,17 @@ class HotelDetailSchema(BaseModel):
     country_id: int
     city_id: int
     owner_id: int
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
     class Config:
         from_attributes = True
 
 
+class HotelNearbySchema(HotelOutSchema):
+    distance_km: float
+
+
 class HotelCreateSchema(BaseModel):
     hotel_name: str = Field(min_length=2, max_length=200)
     stars: Optional[int] = Field(None, ge=1, le=5)
@@ -185,6 +233,8 @@ class HotelCreateSchema(BaseModel):
     street: str = Field(min_length=3, max_length=200)
     country_id: int = Field(gt=0) #для положительных чисел gt=0
     city_id: int = Field(..., gt=0)
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 
 class HotelUpdateSchema(BaseModel):
@@ -195,6 +245,8 @@ class HotelUpdateSchema(BaseModel):
     street: Optional[str] = Field(None, min_length=3, max_length=200)
     country_id: Optional[int] = Field(None, gt=0)
     city_id: Optional[int] = Field(None, gt=0)
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 
 #/////////////////////////////////////////////////////////
@@ -243,6 +295,7 @@ class RoomBaseSchema(BaseModel):
     room_description: str = Field(max_length=1000)
     price: float = Field(gt=0)
     max_guests: int = Field(gt=0, le=100)
+    hotel_id: Optional[int] = None
 
 
 class RoomCreateSchema(RoomBaseSchema):
@@ -260,6 +313,7 @@ class RoomUpdateSchema(BaseModel):
     room_description: Optional[str] = Field(None, max_length=1000)
     price: Optional[float] = Field(None, gt=0)
     max_guests:  Optional[int] = Field(None, gt=0, le=10)
+    hotel_id: Optional[int] = None
 
 
 class RoomOutSchema(RoomBaseSchema):
@@ -319,6 +373,10 @@ class BookingCreateSchema(BaseModel):
     user_id: int
 
 
+class BookingBulkCreateSchema(BaseModel):
+    bookings: List[BookingCreateSchema] = Field(min_length=1, max_length=100)
+
+
 class BookingDetailSchema(BookingOutSchema):
     pass
 
@@ -355,6 +413,20 @@ class ReviewUpdateSchema(BaseModel):
     comment: Optional[str] = Field(None, max_length=1000)
 
 
+class HotelRatingSchema(BaseModel):
+    avg: Optional[float] = None
+    count: int = 0
+    histogram: Dict[int, int] = {} # звёзды -> число отзывов
+
+
+class HotelFullSchema(HotelOutSchema):
+    hotel_images: List[HotelImageOutSchema] = []
+    services: List[ServiceSchema] = []
+    rooms: List[RoomOutSchema] = []
+    rating: HotelRatingSchema
+    latest_reviews: List[ReviewOutSchema] = []
+
+
 #////////////////////////////////////////////////////
 class FavouriteBaseSchema(BaseModel):
     user_id: int
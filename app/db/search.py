@@ -0,0 +1,81 @@
+from fastapi import HTTPException
+from sqlalchemy import select, func, literal_column, or_, and_, table, column
+from app.db.models import Hotel
+from app.db.database import engine
+from app.db.pagination import PageParams, decode_cursor
+
+
+# индекс создаёт миграция 9d2e6a41c7f3_hotel_full_text_search:
+# postgres - генерируемая колонка hotel.search_vector (название с весом A, описание с весом B) + GIN,
+# sqlite - FTS5 таблица hotel_fts, которую синхронизируют триггеры на hotel
+POSTGRES_CONFIG = literal_column("'simple'::regconfig")
+HIGHLIGHT_START, HIGHLIGHT_STOP = '<b>', '</b>'
+
+hotel_fts = table('hotel_fts', column('rowid'))
+
+RESULT_COLUMNS = (Hotel.id, Hotel.hotel_name, Hotel.stars, Hotel.country_id, Hotel.city_id)
+
+
+def _search_cursor(page: PageParams):
+    if not page.after:
+        return None
+    values = decode_cursor(page.after)
+    if (len(values) != 2 or not isinstance(values[0], (int, float))
+            or not isinstance(values[1], int)):
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+    return values
+
+
+def _after(rank, last):
+    # сортировка rank DESC, id ASC
+    last_rank, last_id = last
+    return or_(rank < last_rank, and_(rank == last_rank, Hotel.id > last_id))
+
+
+def _postgres_query(q: str, page: PageParams, last):
+    search_vector = literal_column('hotel.search_vector')
+    tsquery = func.websearch_to_tsquery(POSTGRES_CONFIG, q)
+    rank = func.ts_rank_cd(search_vector, tsquery)
+
+    matches = select(*RESULT_COLUMNS, Hotel.description, rank.label('rank')).where(search_vector.op('@@')(tsquery))
+    if last is not None:
+        matches = matches.where(_after(rank, last))
+    matches = matches.order_by(rank.desc(), Hotel.id).limit(page.limit + 1).subquery()
+
+    # ts_headline дорогой - считаем его только для строк страницы
+    highlight = func.ts_headline(POSTGRES_CONFIG, matches.c.description, tsquery,
+                                 f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxFragments=2')
+    return (select(*(matches.c[column.key] for column in RESULT_COLUMNS), matches.c.rank,
+                   highlight.label('highlight'))
+            .order_by(matches.c.rank.desc(), matches.c.id))
+
+
+def _fts5_query(q: str):
+    # каждое слово в кавычках - чтобы символы запроса не разбирались как синтаксис FTS5
+    terms = [term.replace('"', '""') for term in q.split()]
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def _sqlite_query(q: str, page: PageParams, last):
+    fts = literal_column('hotel_fts')
+    # bm25 чем меньше, тем лучше - разворачиваем, чтобы rank везде сортировался по убыванию
+    rank = -func.bm25(fts, 10.0, 1.0)
+    highlight = func.snippet(fts, 1, HIGHLIGHT_START, HIGHLIGHT_STOP, '…', 24)
+
+    query = (select(*RESULT_COLUMNS, rank.label('rank'), highlight.label('highlight'))
+             .select_from(hotel_fts.join(Hotel, Hotel.id == hotel_fts.c.rowid))
+             .where(fts.op('MATCH')(_fts5_query(q))))
+    if last is not None:
+        query = query.where(_after(rank, last))
+    return query.order_by(rank.desc(), Hotel.id).limit(page.limit + 1)
+
+
+def hotel_search_query(q: str, page: PageParams):
+    # одни пробелы: в sqlite это MATCH '' (ошибка), в postgres пустой tsquery - для обоих 422
+    q = q.strip()
+    if not q:
+        raise HTTPException(status_code=422, detail='Search query is empty')
+    last = _search_cursor(page)
+    if engine.dialect.name == 'postgresql':
+        return _postgres_query(q, page, last)
+    return _sqlite_query(q, page, last)
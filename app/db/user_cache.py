@@ -0,0 +1,99 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional
+from app.config import AUTH_CACHE_TTL_SECONDS, AUTH_TOKEN_CACHE_SIZE, AUTH_USER_CACHE_SIZE
+
+
+class TTLCache:
+    """LRU с временем жизни записи, синхронный - всё в памяти процесса, без await."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, value, ttl: float):
+        if ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, key):
+        self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0}
+
+
+class CurrentUser:
+    """Профиль для проверки доступа: без пароля и ORM состояния, его можно держать между запросами."""
+    __slots__ = ('id', 'user_name', 'first_name', 'last_name', 'role')
+
+    def __init__(self, user):
+        for field in self.__slots__:
+            setattr(self, field, getattr(user, field))
+
+
+class UserCache:
+    """Токен -> (id пользователя, sub) и id -> профиль.
+
+    Токены хранятся по sha256, а не как есть, и живут не дольше своего exp.
+    Профиль сбрасывается в update_user/delete_user этого воркера,
+    в остальных он устаревает через AUTH_CACHE_TTL_SECONDS.
+    sub токена сверяется с user_name профиля: после переименования старые токены не проходят.
+    """
+
+    def __init__(self):
+        self.tokens = TTLCache(AUTH_TOKEN_CACHE_SIZE)
+        self.profiles = TTLCache(AUTH_USER_CACHE_SIZE)
+
+    @staticmethod
+    def _token_key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def token_subject(self, token: str) -> Optional[tuple]:
+        """(id пользователя, sub) или None."""
+        return self.tokens.get(self._token_key(token))
+
+    def remember_token(self, token: str, user_id: int, sub: str, expires_at: Optional[float]):
+        ttl = AUTH_CACHE_TTL_SECONDS
+        if expires_at is not None:
+            ttl = min(ttl, expires_at - time.time())
+        self.tokens.set(self._token_key(token), (user_id, sub), ttl)
+
+    def forget_token(self, token: str):
+        self.tokens.pop(self._token_key(token))
+
+    def profile(self, user_id: int) -> Optional[CurrentUser]:
+        return self.profiles.get(user_id)
+
+    def remember_profile(self, user) -> CurrentUser:
+        current_user = CurrentUser(user)
+        self.profiles.set(user.id, current_user, AUTH_CACHE_TTL_SECONDS)
+        return current_user
+
+    def invalidate(self, user_id: int):
+        self.profiles.pop(user_id)
+
+    def stats(self) -> dict:
+        return {'tokens': self.tokens.stats(), 'profiles': self.profiles.stats()}
+
+
+user_cache = UserCache()
@@ -14,15 +14,6 @@ from fastapi import FastAPI, HTTPException, Depends, APIRouter
 import uvicorn
 from fastapi.responses import HTMLResponse
 from app.routers.router import *
-from app.db.database import  SessionLocal
-
-
-async def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
 
 #booking = FastAPI() если в роутере есть booking, то не нужно создать booking
@@ -2,6 +2,7 @@ import time
 import logging
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
+from app.db.query_stats import start_query_stats
 
 
 logging.basicConfig(level=logging.INFO)
@@ -14,6 +15,8 @@ class LoggingMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         # Записываем время начала обработки запроса
         start_time = time.time()
+        # Счётчик SQL запросов, его заполняют хуки движка (app/db/query_stats.py)
+        query_stats = start_query_stats()
 
         # Выполнение запроса
         response = await call_next(request)
@@ -22,6 +25,12 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         process_time = (time.time() - start_time) * 1000
         print(f"{request.method} {request.url.path} - {process_time:.2f} ms")
 
+        for statement, times in query_stats.n_plus_one().items():
+            logger.warning("possible N+1 in %s %s: %d x %s",
+                           request.method, request.url.path, times, statement)
+
         # Добавляем в заголовок ответа время обработки
         response.headers["X-Process-Time"] = f"{process_time:.2f}ms"
-        return response
\ No newline at end of file
+        response.headers["X-DB-Queries"] = str(query_stats.count)
+        response.headers["X-DB-Time"] = f"{query_stats.total_ms:.2f}ms"
+        return response
@@ -0,0 +1,74 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from app.config import PASSWORD_BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE
+
+
+# deprecated="auto" + bcrypt__rounds: хеш с другой стоимостью считается устаревшим,
+# verify_and_update вернёт новый хеш - так смена PASSWORD_BCRYPT_ROUNDS доезжает до всех при входе
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=PASSWORD_BCRYPT_ROUNDS)
+
+
+class PasswordHasher:
+    """bcrypt (сотни мс CPU) в своём пуле потоков: библиотека отпускает GIL,
+    поэтому потоки считают параллельно, а event loop обслуживает остальные запросы.
+
+    Очередь ограничена: при наплыве логинов лишние сразу получают 503,
+    а не копятся в памяти и не держат соединения с базой.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self.in_flight = 0
+        self.peak_queue_depth = 0
+        self.hashed = 0
+        self.verified = 0
+        self.rehashed = 0
+        self.rejected = 0
+
+    @property
+    def queue_depth(self) -> int:
+        # задачи сверх числа потоков ждут своей очереди в executor
+        return max(self.in_flight - self.workers, 0)
+
+    async def _run(self, fn, *args):
+        if self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail='Too many login attempts, try again later',
+                                headers={'Retry-After': '1'})
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        self.peak_queue_depth = max(self.peak_queue_depth, self.queue_depth)
+        job = self._executor.submit(fn, *args)
+        # уменьшаем счётчик, когда задача реально закончилась в пуле: отмена ожидающего запроса
+        # (клиент ушёл) уже запущенный bcrypt не останавливает. Колбэк зовётся из потока пула
+        job.add_done_callback(lambda _: loop.call_soon_threadsafe(self._finished))
+        return await asyncio.wrap_future(job)
+
+    def _finished(self):
+        self.in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        hashed_password = await self._run(pwd_context.hash, password)
+        self.hashed += 1
+        return hashed_password
+
+    async def verify_and_update(self, password: str, hashed_password: str):
+        """(пароль верный, новый хеш или None) - новый хеш нужно сохранить в пользователя."""
+        valid, new_hash = await self._run(pwd_context.verify_and_update, password, hashed_password)
+        self.verified += 1
+        if new_hash is not None:
+            self.rehashed += 1
+        return valid, new_hash
+
+    def stats(self) -> dict:
+        return {'workers': self.workers, 'max_queue': self.max_queue, 'rounds': PASSWORD_BCRYPT_ROUNDS,
+                'in_flight': self.in_flight, 'queue_depth': self.queue_depth,
+                'peak_queue_depth': self.peak_queue_depth, 'hashed': self.hashed,
+                'verified': self.verified, 'rehashed': self.rehashed, 'rejected': self.rejected}
+
+
+password_hasher = PasswordHasher()
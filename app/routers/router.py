@@ -1,14 +1,34 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.api import (user, country, city, hotel, hotelimage,
                      favourite, favouriteitem, review, room,
                      roomimage, service, bookings, health_status,
-                     auth, soical_auth)
+                     auth, soical_auth, autocomplete)
 from starlette.middleware.sessions import SessionMiddleware
 from app.middlewares.middleware import LoggingMiddleware
+from app.db.database import SessionLocal
+from app.db.availability_index import build_availability_index, refresh_availability_index
+from app.db.autocomplete_index import build_autocomplete_index, refresh_autocomplete_index
+from app.db.reference_cache import reference_cache
+from app.db.refresh_tokens import purge_refresh_tokens_periodically
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await build_availability_index(SessionLocal)
+    await build_autocomplete_index(SessionLocal)
+    await reference_cache.reload_all(SessionLocal)
+    background = [asyncio.create_task(refresh_availability_index(SessionLocal)),
+                  asyncio.create_task(refresh_autocomplete_index(SessionLocal)),
+                  asyncio.create_task(reference_cache.listen(SessionLocal)),
+                  asyncio.create_task(purge_refresh_tokens_periodically(SessionLocal))]
+    yield
+    for task in background:
+        task.cancel()
 
-booking = FastAPI()
+
+booking = FastAPI(lifespan=lifespan)
 
 booking.include_router(user.user_router)
 booking.include_router(auth.auth_router)
@@ -25,6 +45,7 @@ booking.include_router(review.review_router)
 booking.include_router(favourite.favourite_router)
 booking.include_router(favouriteitem.favouriteitem_router)
 booking.include_router(health_status.health_routers)
+booking.include_router(autocomplete.autocomplete_router)
 
 
 #oauth middlewares
@@ -26,6 +26,16 @@ target_metadata = Base.metadata
 # ... etc.
 
 
+# объекты полнотекстового поиска (миграция 9d2e6a41c7f3) живут вне моделей,
+# autogenerate не должен предлагать их удалить
+SEARCH_OBJECTS = {'search_vector', 'ix_hotel_search_vector', 'hotel_fts'}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    return not (reflected and compare_to is None and
+                (name in SEARCH_OBJECTS or (name or '').startswith('hotel_fts_')))
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -42,6 +52,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -65,7 +76,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=include_object
         )
 
         with context.begin_transaction():
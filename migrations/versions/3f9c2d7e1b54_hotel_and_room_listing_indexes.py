@@ -0,0 +1,44 @@
+"""hotel and room listing filter/sort indexes
+
+Revision ID: 3f9c2d7e1b54
+Revises: a490976885a6
+Create Date: 2026-10-18 14:41:12.306518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2d7e1b54'
+down_revision: Union[str, Sequence[str], None] = 'a490976885a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_hotel_city_id_stars_id', 'hotel', ['city_id', 'stars', 'id']),
+    ('ix_hotel_country_id_stars_id', 'hotel', ['country_id', 'stars', 'id']),
+    ('ix_hotel_owner_id_id', 'hotel', ['owner_id', 'id']),
+    ('ix_hotel_stars_id', 'hotel', ['stars', 'id']),
+    ('ix_hotel_hotel_name_id', 'hotel', ['hotel_name', 'id']),
+    ('ix_room_hotel_id_price_id', 'room', ['hotel_id', 'price', 'id']),
+    ('ix_room_room_type_price_id', 'room', ['room_type', 'price', 'id']),
+    ('ix_room_room_status_price_id', 'room', ['room_status', 'price', 'id']),
+    ('ix_room_price_id', 'room', ['price', 'id']),
+    ('ix_room_max_guests_id', 'room', ['max_guests', 'id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,30 @@
+"""hotel_image and review hotel_id indexes
+
+Revision ID: 5e8b3a9c0f17
+Revises: c1a7f08e5d92
+Create Date: 2026-10-18 16:48:33.170265
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8b3a9c0f17'
+down_revision: Union[str, Sequence[str], None] = 'c1a7f08e5d92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_hotel_image_hotel_id', 'hotel_image', ['hotel_id'], unique=False)
+    op.create_index('ix_review_hotel_id_id', 'review', ['hotel_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_review_hotel_id_id', table_name='review')
+    op.drop_index('ix_hotel_image_hotel_id', table_name='hotel_image')
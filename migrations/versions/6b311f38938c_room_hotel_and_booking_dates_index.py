@@ -0,0 +1,38 @@
+"""room hotel_id and booking dates index
+
+Revision ID: 6b311f38938c
+Revises: 07494e943915
+Create Date: 2026-10-18 12:05:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b311f38938c'
+down_revision: Union[str, Sequence[str], None] = '07494e943915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('room', sa.Column('hotel_id', sa.Integer(), nullable=True))
+    # sqlite не умеет ALTER для ограничений - batch пересоздаёт таблицу, в postgres это обычный ALTER
+    with op.batch_alter_table('room') as batch:
+        batch.create_foreign_key('room_hotel_id_fkey', 'hotel', ['hotel_id'], ['id'])
+    op.create_index(op.f('ix_room_hotel_id'), 'room', ['hotel_id'], unique=False)
+    op.create_index('ix_booking_room_id_check_in_check_out', 'booking',
+                    ['room_id', 'check_in', 'check_out'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_booking_room_id_check_in_check_out', table_name='booking')
+    op.drop_index(op.f('ix_room_hotel_id'), table_name='room')
+    with op.batch_alter_table('room') as batch:
+        batch.drop_constraint('room_hotel_id_fkey', type_='foreignkey')
+    op.drop_column('room', 'hotel_id')
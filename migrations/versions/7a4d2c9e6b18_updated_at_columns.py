@@ -0,0 +1,41 @@
+"""updated_at columns
+
+Revision ID: 7a4d2c9e6b18
+Revises: e4f61b2d8a35
+Create Date: 2026-10-18 18:02:47.301926
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a4d2c9e6b18'
+down_revision: Union[str, Sequence[str], None] = 'e4f61b2d8a35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ['country', 'city', 'service', 'hotel', 'room', 'review']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    # updated_at в utc без таймзоны, как created_date
+    now = "(now() AT TIME ZONE 'utc')" if postgres else 'CURRENT_TIMESTAMP'
+    for table in TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute(f'UPDATE {table} SET updated_at = {now}')
+        # sqlite не меняет NOT NULL без пересоздания таблицы (а с ним пропали бы триггеры hotel_fts),
+        # там колонка остаётся nullable - значение всё равно всегда ставит модель
+        if postgres:
+            op.alter_column(table, 'updated_at', nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(TABLES):
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,69 @@
+"""hotel full text search
+
+Revision ID: 9d2e6a41c7f3
+Revises: 3f9c2d7e1b54
+Create Date: 2026-10-18 15:27:44.902113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d2e6a41c7f3'
+down_revision: Union[str, Sequence[str], None] = '3f9c2d7e1b54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # генерируемая колонка - postgres сам пересчитывает её при каждой записи
+        op.execute(
+            "ALTER TABLE hotel ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple'::regconfig, coalesce(hotel_name, '')), 'A') || "
+            "setweight(to_tsvector('simple'::regconfig, coalesce(description, '')), 'B')"
+            ") STORED"
+        )
+        op.execute("CREATE INDEX ix_hotel_search_vector ON hotel USING gin (search_vector)")
+    elif dialect == 'sqlite':
+        # external content FTS5 - текст хранится только в hotel, hotel_fts держит индекс
+        op.execute(
+            "CREATE VIRTUAL TABLE hotel_fts USING fts5("
+            "hotel_name, description, content='hotel', content_rowid='id')"
+        )
+        op.execute(
+            "CREATE TRIGGER hotel_fts_ai AFTER INSERT ON hotel BEGIN "
+            "INSERT INTO hotel_fts(rowid, hotel_name, description) "
+            "VALUES (new.id, new.hotel_name, new.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER hotel_fts_ad AFTER DELETE ON hotel BEGIN "
+            "INSERT INTO hotel_fts(hotel_fts, rowid, hotel_name, description) "
+            "VALUES ('delete', old.id, old.hotel_name, old.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER hotel_fts_au AFTER UPDATE OF hotel_name, description ON hotel BEGIN "
+            "INSERT INTO hotel_fts(hotel_fts, rowid, hotel_name, description) "
+            "VALUES ('delete', old.id, old.hotel_name, old.description); "
+            "INSERT INTO hotel_fts(rowid, hotel_name, description) "
+            "VALUES (new.id, new.hotel_name, new.description); END"
+        )
+        op.execute("INSERT INTO hotel_fts(hotel_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_hotel_search_vector")
+        op.execute("ALTER TABLE hotel DROP COLUMN IF EXISTS search_vector")
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS hotel_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS hotel_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS hotel_fts_ai")
+        op.execute("DROP TABLE IF EXISTS hotel_fts")
@@ -0,0 +1,37 @@
+"""booking no overlap exclusion constraint
+
+Revision ID: a490976885a6
+Revises: 6b311f38938c
+Create Date: 2026-10-18 13:22:07.540391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a490976885a6'
+down_revision: Union[str, Sequence[str], None] = '6b311f38938c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    # btree_gist нужен для room_id WITH = внутри gist индекса
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.execute(
+        "ALTER TABLE booking ADD CONSTRAINT booking_room_id_dates_excl "
+        "EXCLUDE USING gist (room_id WITH =, daterange(check_in, check_out) WITH &&) "
+        "WHERE (booking_status != 'cancelled' AND check_in IS NOT NULL AND check_out IS NOT NULL)"
+    )
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_constraint('booking_room_id_dates_excl', 'booking')
@@ -0,0 +1,56 @@
+"""refresh token hash
+
+Revision ID: b8e35f1a9d60
+Revises: 7a4d2c9e6b18
+Create Date: 2026-10-18 18:40:12.557302
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e35f1a9d60'
+down_revision: Union[str, Sequence[str], None] = '7a4d2c9e6b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    postgres = bind.dialect.name == 'postgresql'
+    op.add_column('refresh_token', sa.Column('token_hash', sa.String(length=64), nullable=True))
+
+    # выданные токены продолжают работать: считаем sha256 от уже сохранённых
+    if postgres:
+        op.execute("UPDATE refresh_token SET token_hash = encode(sha256(convert_to(token, 'UTF8')), 'hex')")
+    else:
+        rows = bind.execute(sa.text('SELECT id, token FROM refresh_token')).all()
+        for token_id, token in rows:
+            bind.execute(sa.text('UPDATE refresh_token SET token_hash = :token_hash WHERE id = :id'),
+                         {'token_hash': hashlib.sha256(token.encode()).hexdigest(), 'id': token_id})
+    # одинаковые токены (выданные в одну секунду) - оставляем один
+    op.execute("DELETE FROM refresh_token WHERE id NOT IN "
+               "(SELECT MIN(id) FROM refresh_token GROUP BY token_hash)")
+    # batch - на SQLite NOT NULL меняется только пересозданием таблицы, триггеров у refresh_token нет
+    with op.batch_alter_table('refresh_token') as batch:
+        batch.alter_column('token_hash', existing_type=sa.String(length=64), nullable=False)
+        batch.drop_column('token')
+    op.create_index(op.f('ix_refresh_token_token_hash'), 'refresh_token', ['token_hash'], unique=True)
+    op.create_index(op.f('ix_refresh_token_created_at'), 'refresh_token', ['created_at'], unique=False)
+    op.create_index(op.f('ix_refresh_token_user_id'), 'refresh_token', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_refresh_token_user_id'), table_name='refresh_token')
+    op.drop_index(op.f('ix_refresh_token_created_at'), table_name='refresh_token')
+    op.drop_index(op.f('ix_refresh_token_token_hash'), table_name='refresh_token')
+    # сами токены из хешей не восстановить - старые сессии придётся открыть заново
+    op.execute('DELETE FROM refresh_token')
+    op.add_column('refresh_token', sa.Column('token', sa.String(length=512), nullable=False, server_default=''))
+    op.drop_column('refresh_token', 'token_hash')
@@ -0,0 +1,32 @@
+"""hotel latitude and longitude
+
+Revision ID: c1a7f08e5d92
+Revises: 9d2e6a41c7f3
+Create Date: 2026-10-18 16:02:19.551470
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1a7f08e5d92'
+down_revision: Union[str, Sequence[str], None] = '9d2e6a41c7f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('hotel', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('hotel', sa.Column('longitude', sa.Float(), nullable=True))
+    op.create_index('ix_hotel_latitude_longitude', 'hotel', ['latitude', 'longitude'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_hotel_latitude_longitude', table_name='hotel')
+    op.drop_column('hotel', 'longitude')
+    op.drop_column('hotel', 'latitude')
@@ -0,0 +1,51 @@
+"""hotel rating aggregates
+
+Revision ID: e4f61b2d8a35
+Revises: 5e8b3a9c0f17
+Create Date: 2026-10-18 17:20:05.884612
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4f61b2d8a35'
+down_revision: Union[str, Sequence[str], None] = '5e8b3a9c0f17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COUNTERS = ['rating_count', 'rating_sum', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('hotel', sa.Column('rating_avg', sa.Float(), server_default='0', nullable=False))
+    for name in COUNTERS:
+        op.add_column('hotel', sa.Column(name, sa.Integer(), server_default='0', nullable=False))
+
+    # заполняем по существующим отзывам, дальше агрегаты поддерживают обработчики review
+    stars = "(SELECT {expr} FROM review WHERE review.hotel_id = hotel.id AND review.stars IS NOT NULL{extra})"
+    op.execute(
+        "UPDATE hotel SET "
+        f"rating_count = {stars.format(expr='COUNT(*)', extra='')}, "
+        f"rating_sum = {stars.format(expr='COALESCE(SUM(review.stars), 0)', extra='')}, "
+        + ", ".join(f"rating_{value} = {stars.format(expr='COUNT(*)', extra=f' AND review.stars = {value}')}"
+                    for value in range(1, 6))
+    )
+    op.execute("UPDATE hotel SET rating_avg = CAST(rating_sum AS FLOAT) / rating_count WHERE rating_count > 0")
+
+    op.create_index('ix_hotel_rating_avg_id', 'hotel', ['rating_avg', 'id'], unique=False)
+    op.create_index('ix_hotel_city_id_rating_avg_id', 'hotel', ['city_id', 'rating_avg', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_hotel_city_id_rating_avg_id', table_name='hotel')
+    op.drop_index('ix_hotel_rating_avg_id', table_name='hotel')
+    for name in reversed(COUNTERS):
+        op.drop_column('hotel', name)
+    op.drop_column('hotel', 'rating_avg')